@@ -3,16 +3,50 @@ sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 
 
-from flask import Flask, render_template, jsonify, request
-import os, csv, threading, time
+from flask import Flask, render_template, jsonify, request, g, Response
+import atexit, os, csv, threading, time
 from datetime import datetime
 from sensors.mock_sensors import get_mock_readings
-from models.decision_engine import decide_irrigation
+from models.decision_engine import decide_irrigation, decision_cache
+from utils import metrics
+from utils.rollups import RollupEngine, to_epoch
+from utils import shared_state
 
 app = Flask(__name__)
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "../data/live_log.csv")
 os.makedirs(os.path.dirname(DATA_PATH), exist_ok=True)
+ROLLUP_DB = os.environ.get("IRRIGATION_ROLLUP_DB", os.path.join(os.path.dirname(__file__), "../data/rollups.db"))
+rollups = RollupEngine(ROLLUP_DB)
+atexit.register(rollups.close)  # persist still-open buckets on shutdown
+
+live_feed = shared_state.LiveFeed()
+atexit.register(live_feed.close)
+
+def live_readings():
+    """Latest reading + decision published by the controller, or None if it isn't running."""
+    reader = live_feed.reader()
+    if reader is None:
+        return None
+    latest = shared_state.to_dict(reader.latest(1)[0])
+    latest["timestamp"] = datetime.fromtimestamp(latest["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+    return latest
+
+REQUEST_SECONDS = metrics.histogram("irrigation_http_request_seconds", "Flask request latency", ["endpoint"])
+INFLIGHT = metrics.gauge("irrigation_http_inflight_requests", "Requests currently being served (queue depth)")
+CSV_WRITE_SECONDS = metrics.histogram("irrigation_csv_write_seconds", "Time to append rows to a CSV file", ["file"])
+
+@app.before_request
+def _start_timer():
+    g.started = time.perf_counter()
+    INFLIGHT.inc()
+
+@app.teardown_request
+def _record_timing(exc=None):
+    started = g.pop("started", None)
+    if started is not None:
+        INFLIGHT.dec()
+        REQUEST_SECONDS.labels(endpoint=request.endpoint or "unknown").observe(time.perf_counter() - started)
 
 @app.route("/")
 def index():
@@ -20,24 +54,81 @@ def index():
 
 @app.route("/api/sensor_data")
 def sensor_data():
+    live = live_readings()
+    if live is not None:
+        # The controller already logged and rolled this reading up
+        live["irrigation"] = "ON" if live.pop("decision") == "IRRIGATION" else "OFF"
+        return jsonify(live)
+
     data = get_mock_readings()
     decision = decide_irrigation(data)
     data["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     data["irrigation"] = "ON" if decision == 1 else "OFF"
     
     # Log data
-    with open(DATA_PATH, "a", newline="") as f:
+    with CSV_WRITE_SECONDS.labels(file="live_log").time(), open(DATA_PATH, "a", newline="") as f:
         writer = csv.DictWriter(f, fieldnames=data.keys())
         if f.tell() == 0:
             writer.writeheader()
         writer.writerow(data)
+    rollups.add(data)
     
     return jsonify(data)
 
+@app.route("/api/live")
+def live_state():
+    """Latest record per node from the controller's shared-memory ring (?history=N for more)."""
+    reader = live_feed.reader()
+    if reader is None:
+        return jsonify({"error": "controller not publishing live state"}), 503
+    history = request.args.get("history", type=int)
+    payload = {"nodes": reader.latest_per_node(), "written": reader.written}
+    if history:
+        payload["history"] = [shared_state.to_dict(r) for r in reader.latest(history)]
+    return jsonify(payload)
+
+@app.route("/api/decision_cache")
+def decision_cache_stats():
+    return jsonify(decision_cache.stats())
+
+@app.route("/api/rollups")
+def rollup_range():
+    """?start=ISO&end=ISO[&node=..][&level=minute|hour|day] — defaults to the last 24 hours."""
+    end = request.args.get("end") or time.time()
+    start = request.args.get("start") or to_epoch(end) - 86400
+    node = request.args.get("node")
+    level = request.args.get("level")
+    if level and level not in rollups.levels:
+        return jsonify({"error": f"unknown level {level}"}), 400
+    return jsonify({
+        "buckets": rollups.query(start, end, node=node, level=level),
+        "totals": rollups.totals(start, end, node=node),
+    })
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+@app.route("/debug/profiler", methods=["GET", "POST"])
+def profiler_control():
+    """POST action=start|stop|reset switches the sampling profiler; GET only returns collapsed stacks."""
+    if request.method == "POST":
+        action = request.values.get("action")
+        if action == "start":
+            metrics.profiler.start()
+        elif action == "stop":
+            metrics.profiler.stop()
+        elif action == "reset":
+            metrics.profiler.reset()
+        else:
+            return jsonify({"error": "action must be start, stop or reset"}), 400
+        return jsonify({"running": metrics.profiler.running, "stacks": len(metrics.profiler.samples)})
+    return Response(metrics.profiler.report(request.args.get("top", type=int)), mimetype="text/plain")
+
 @app.route("/api/chatbot", methods=["POST"])
 def chatbot():
     query = request.json.get("query", "").lower()
-    data = get_mock_readings()
+    data = live_readings() or get_mock_readings()
     response = "Sorry, I didn’t understand that."
 
     if "moisture" in query:
@@ -49,8 +140,12 @@ def chatbot():
     elif "light" in query:
         response = f"Light intensity is {data['light']:.1f} lux."
     elif "irrigation" in query:
-        decision = decide_irrigation(data)
-        response = "Irrigation is ON." if decision == 1 else "Irrigation is OFF."
+        # Live readings carry the controller's own decision; only mock data needs the model
+        if data.get("decision") in ("IRRIGATION", "NO_IRRIGATION"):
+            irrigating = data["decision"] == "IRRIGATION"
+        else:
+            irrigating = decide_irrigation(data) == 1
+        response = "Irrigation is ON." if irrigating else "Irrigation is OFF."
     elif "status" in query:
         response = f"Soil: {data['soil_moisture']:.1f}% | Air: {data['air_temp']:.1f}°C | Light: {data['light']:.1f} lux"
 
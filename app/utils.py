@@ -16,6 +16,9 @@ def log_data(sensor_data, decision, reason, water_saved):
             water_saved
         ])
 
-def calculate_water_saved(prev_moisture, curr_moisture):
+def water_saved_litres(prev_moisture, curr_moisture):
     delta = max(0, prev_moisture - curr_moisture)
-    return round(delta * 0.1, 2)  # Example conversion
+    return delta * 0.1  # Example conversion
+
+def calculate_water_saved(prev_moisture, curr_moisture):
+    return round(water_saved_litres(prev_moisture, curr_moisture), 2)
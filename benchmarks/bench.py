@@ -0,0 +1,504 @@
+"""
+End-to-end benchmark suite for the smart irrigation stack.
+
+    python benchmarks/bench.py run --out benchmarks/results/current.json [--quick]
+    python benchmarks/bench.py compare benchmarks/results/baseline.json benchmarks/results/current.json
+
+Fixtures are generated from a seeded SyntheticFieldGenerator and the model used
+for inference is trained on them, so two runs on the same machine see the same
+inputs. All file output goes to a temporary directory; Supabase is never
+contacted (the offline path is what gets measured).
+"""
+import argparse
+import contextlib
+import fnmatch
+import importlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.dedup import DedupIndex
+from utils.rollups import RollupEngine
+
+SEED = 42
+DEFAULT_THRESHOLD = 0.20  # flag a benchmark when it gets 20% slower
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register ``fn(ctx)`` under ``name``; it returns a stats dict from ``measure``."""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def measure(fn, repeat=50, warmup=3, items=1):
+    """Time ``fn`` ``repeat`` times; ``items`` is the work per call, for throughput."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "n": repeat,
+        "median_s": median,
+        "p95_s": samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        "min_s": samples[0],
+        "items_per_s": items / median if median else None,
+    }
+
+
+@contextlib.contextmanager
+def working_dir(path):
+    """Run with ``path`` as cwd; the repo's modules write to cwd-relative paths."""
+    old = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(old)
+
+
+# =============== FIXTURES ===============
+class Context:
+    def __init__(self, tmpdir, quick=False):
+        self.tmpdir = tmpdir
+        self.quick = quick
+        self._readings = None
+        self._frames = {}
+        self._main = None
+
+    def scale(self, full, quick):
+        return quick if self.quick else full
+
+    def readings(self, n=None):
+        """Seeded sensor readings in the dict shape main.py produces."""
+        if self._readings is None:
+            from generate_mock_data import SyntheticFieldGenerator
+            gen = SyntheticFieldGenerator(num_nodes=10, seed=SEED, start=datetime(2025, 6, 1))
+            chunk = gen.generate(1000)
+            self._readings = [
+                {
+                    "timestamp": str(chunk["timestamp"][i]),
+                    "soil_temp": float(chunk["soil_temp"][i]),
+                    "air_temp": float(chunk["air_temp"][i]),
+                    "soil_moisture": float(chunk["soil_moisture"][i]),
+                    "humidity": float(chunk["humidity"][i]),
+                    "light": float(chunk["light_intensity"][i]),
+                }
+                for i in range(len(chunk["timestamp"]))
+            ]
+        return self._readings if n is None else self._readings[:n]
+
+    def training_frame(self, rows):
+        """Preprocessed training frame with ``rows`` rows, as train_model expects."""
+        if rows not in self._frames:
+            import pandas as pd
+            from generate_mock_data import SyntheticFieldGenerator
+            gen = SyntheticFieldGenerator(num_nodes=10, seed=SEED, start=datetime(2025, 6, 1))
+            df = pd.concat(
+                [pd.DataFrame(c) for c in gen.chunks(rows, 100_000)], ignore_index=True
+            ).rename(columns={"light_intensity": "light"})
+            df["temp_diff"] = df["air_temp"] - df["soil_temp"]
+            df["humidity_ratio"] = df["humidity"] / (df["soil_moisture"] + 1)
+            df["irrigation_needed"] = (df["soil_moisture"] < 30).astype(int)
+            self._frames[rows] = df
+        return self._frames[rows]
+
+    def train_model_module(self):
+        train_model = importlib.import_module("models.train_model")
+        train_model.MODEL_PATH = os.path.join(self.tmpdir, "bench_model.pkl")
+        train_model.REPORT_PATH = os.path.join(self.tmpdir, "bench_report.txt")
+        train_model.REFERENCE_PATH = os.path.join(self.tmpdir, "bench_reference.json")
+        return train_model
+
+    def main_module(self):
+        """main.py with a fixture model, no Supabase client and a temp offline backup."""
+        if self._main is None:
+            import joblib
+            main = importlib.import_module("main")
+            train_model = self.train_model_module()
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                train_model.train_xgboost_model(self.training_frame(self.scale(5000, 1000)))
+            main.model = joblib.load(train_model.MODEL_PATH)
+            main.supabase = None
+            main.OFFLINE_BACKUP = os.path.join(self.tmpdir, "offline_backup.csv")
+            main.ingest_index = DedupIndex(main.OFFLINE_BACKUP + ".idx", max_keys=main.INGEST_INDEX_KEYS)
+            self._main = main
+        return self._main
+
+
+# =============== INFERENCE ===============
+@benchmark("inference.single_uncached")
+def bench_single_uncached(ctx):
+    main = ctx.main_module()
+    readings = ctx.readings(200)
+    it = iter(range(10**9))
+    return measure(lambda: main._predict_irrigation(readings[next(it) % len(readings)]),
+                   repeat=ctx.scale(500, 100))
+
+
+@benchmark("inference.single_cached")
+def bench_single_cached(ctx):
+    main = ctx.main_module()
+    main.decision_cache.clear()
+    readings = ctx.readings(200)
+    for r in readings:  # warm up: every measured call is then a cache hit or node skip
+        main.decide_irrigation(r)
+    misses = main.decision_cache.stats()["misses"]
+    it = iter(range(10**9))
+    result = measure(lambda: main.decide_irrigation(readings[next(it) % len(readings)]),
+                     repeat=ctx.scale(2000, 200))
+    result["cache_misses"] = main.decision_cache.stats()["misses"] - misses
+    return result
+
+
+@benchmark("inference.batch_1000")
+def bench_batch(ctx):
+    main = ctx.main_module()
+    readings = ctx.readings(1000)
+    return measure(lambda: main.decide_irrigation_batch(readings),
+                   repeat=ctx.scale(50, 10), items=len(readings))
+
+
+# =============== LOGGING / SPOOL ===============
+@benchmark("spool.offline_backup_append")
+def bench_offline_append(ctx):
+    main = ctx.main_module()
+    records = [dict(r, decision="NO_IRRIGATION") for r in ctx.readings()]
+    it = iter(range(10**9))
+    return measure(lambda: main.upload_to_supabase(records[next(it) % len(records)]),
+                   repeat=ctx.scale(500, 100))
+
+
+@benchmark("spool.duplicate_drop")
+def bench_duplicate_drop(ctx):
+    main = ctx.main_module()
+    record = dict(ctx.readings(1)[0], decision="NO_IRRIGATION")
+    main.upload_to_supabase(record)
+    return measure(lambda: main.upload_to_supabase(record), repeat=ctx.scale(2000, 200))
+
+
+@benchmark("spool.log_data_append")
+def bench_log_data(ctx):
+    from app.utils import log_data
+    reading = ctx.readings(1)[0]
+    os.makedirs(os.path.join(ctx.tmpdir, "data"), exist_ok=True)
+    with working_dir(ctx.tmpdir):
+        return measure(lambda: log_data(reading, 1, "soil dry", 0.0), repeat=ctx.scale(2000, 200))
+
+
+# =============== TRAINING ===============
+def _bench_training(ctx, rows):
+    train_model = ctx.train_model_module()
+    df = ctx.training_frame(rows)
+    devnull = open(os.devnull, "w")
+    with contextlib.redirect_stdout(devnull):
+        return measure(lambda: train_model.train_xgboost_model(df), repeat=ctx.scale(3, 1),
+                       warmup=0, items=rows)
+
+
+@benchmark("training.rows_1000")
+def bench_training_1k(ctx):
+    return _bench_training(ctx, 1000)
+
+
+@benchmark("training.rows_10000")
+def bench_training_10k(ctx):
+    return _bench_training(ctx, 10_000)
+
+
+@benchmark("training.rows_100000")
+def bench_training_100k(ctx):
+    return _bench_training(ctx, ctx.scale(100_000, 20_000))
+
+
+# =============== SERVING ===============
+def _flask_client(ctx):
+    flask_app = importlib.import_module("app.app")
+    flask_app.DATA_PATH = os.path.join(ctx.tmpdir, "live_log.csv")
+    flask_app.rollups = RollupEngine(os.path.join(ctx.tmpdir, "app_rollups.db"))
+    return flask_app.app.test_client()
+
+
+@benchmark("serving.sensor_data")
+def bench_sensor_data(ctx):
+    client = _flask_client(ctx)
+    return measure(lambda: client.get("/api/sensor_data"), repeat=ctx.scale(500, 100))
+
+
+@benchmark("serving.chatbot")
+def bench_chatbot(ctx):
+    client = _flask_client(ctx)
+    return measure(lambda: client.post("/api/chatbot", json={"query": "irrigation status"}),
+                   repeat=ctx.scale(500, 100))
+
+
+# =============== CHAT ASSISTANT ===============
+CHAT_PROMPTS = [
+    "should i water the field now",
+    "what is the soil moisture",
+    "is it too hot for the crops",
+    "when should irrigation run today",
+    "how much water did we save",
+    "is the humidity too low",
+    "what does the light sensor say",
+    "give me a status summary",
+]
+
+
+def tiny_chat_model():
+    """A randomly initialised 2-layer T5 and word-level tokenizer built in-process (no download)."""
+    import torch
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast, T5Config, T5ForConditionalGeneration
+
+    torch.manual_seed(SEED)
+    words = sorted({w for p in CHAT_PROMPTS for w in p.split()} | {"sensor", "readings:", "soil", "moisture"})
+    vocab = {"<pad>": 0, "</s>": 1, "<unk>": 2}
+    vocab.update({w: i + 3 for i, w in enumerate(words)})
+    backend = Tokenizer(models.WordLevel(vocab, unk_token="<unk>"))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, pad_token="<pad>",
+                                        eos_token="</s>", unk_token="<unk>")
+    config = T5Config(vocab_size=len(vocab), d_model=128, d_kv=32, d_ff=512, num_layers=2,
+                      num_heads=4, pad_token_id=0, eos_token_id=1, decoder_start_token_id=0)
+    return T5ForConditionalGeneration(config), tokenizer
+
+
+def _chat_assistant(ctx, **options):
+    import copy
+    from utils.chat_assistant import ChatAssistant
+    if not hasattr(ctx, "_chat_model"):
+        ctx._chat_model = tiny_chat_model()
+    model, tokenizer = ctx._chat_model
+    return ChatAssistant(device="cpu", model=copy.deepcopy(model), tokenizer=tokenizer, **options)
+
+
+def _chat_latency(ctx, **options):
+    bot = _chat_assistant(ctx, cache_size=0, **options)
+    it = iter(range(10**9))
+    return measure(lambda: bot.ask(CHAT_PROMPTS[next(it) % len(CHAT_PROMPTS)], max_length=16),
+                   repeat=ctx.scale(40, 10))
+
+
+@benchmark("chat.latency_fp32")
+def bench_chat_fp32(ctx):
+    return _chat_latency(ctx)
+
+
+@benchmark("chat.latency_int8")
+def bench_chat_int8(ctx):
+    return _chat_latency(ctx, quantize=True)
+
+
+@benchmark("chat.cache_hit")
+def bench_chat_cache_hit(ctx):
+    bot = _chat_assistant(ctx)
+    state = {"soil_moisture": 31.2, "air_temp": 30.1}
+    bot.ask(CHAT_PROMPTS[0], max_length=16, sensor_state=state)
+    return measure(lambda: bot.ask(CHAT_PROMPTS[0].upper() + "?", max_length=16,
+                                   sensor_state={"soil_moisture": 32.0, "air_temp": 29.5}),
+                   repeat=ctx.scale(2000, 200))
+
+
+def _chat_concurrent(ctx, **options):
+    from concurrent.futures import ThreadPoolExecutor
+    bot = _chat_assistant(ctx, cache_size=0, **options)
+    users = 8
+    pool = ThreadPoolExecutor(max_workers=users)
+
+    def burst():
+        list(pool.map(lambda p: bot.ask(p, max_length=16), CHAT_PROMPTS[:users]))
+
+    try:
+        return measure(burst, repeat=ctx.scale(10, 3), warmup=1, items=users)
+    finally:
+        pool.shutdown()
+
+
+@benchmark("chat.concurrent8_unbatched")
+def bench_chat_unbatched(ctx):
+    return _chat_concurrent(ctx)
+
+
+@benchmark("chat.concurrent8_batched")
+def bench_chat_batched(ctx):
+    return _chat_concurrent(ctx, batch_window_ms=10, max_batch_size=8)
+
+
+# =============== SCHEDULER ===============
+def _scheduler_fixture(zones, budget_l):
+    import random
+    from models.scheduler import IrrigationScheduler
+    rng = random.Random(SEED)
+    scheduler = IrrigationScheduler(pump_capacity=16, daily_budget_l=budget_l, clock=lambda: 1_750_000_000.0)
+    ids = list(range(zones))
+    moistures = [rng.uniform(10, 90) for _ in ids]
+    scheduler.update_many(ids, [1 if m < 45 else 0 for m in moistures],
+                          [rng.random() for _ in ids], moistures)
+    return scheduler, rng
+
+
+@benchmark("scheduler.replan_10000_zones")
+def bench_scheduler_replan(ctx):
+    # Budget large enough that every thirsty zone gets scheduled
+    scheduler, _ = _scheduler_fixture(10_000, budget_l=10**9)
+    return measure(scheduler.plan, repeat=ctx.scale(50, 10))
+
+
+@benchmark("scheduler.update_plus_replan_10000_zones")
+def bench_scheduler_incremental(ctx):
+    scheduler, rng = _scheduler_fixture(10_000, budget_l=10**9)
+
+    def step():
+        # 1% of zones report a new reading, then the schedule is rebuilt
+        for _ in range(100):
+            zone = rng.randrange(10_000)
+            moisture = rng.uniform(10, 90)
+            scheduler.update(zone, 1 if moisture < 45 else 0, rng.random(), moisture)
+        scheduler.plan()
+
+    return measure(step, repeat=ctx.scale(50, 10))
+
+
+# =============== SIMULATION ===============
+@benchmark("sim.days_7_nodes_10")
+def bench_simulation(ctx):
+    # Whole controller loop on a virtual clock: 7 days x 10 nodes at 10-minute readings
+    ctx.main_module()
+    import simulate
+    return measure(lambda: simulate.simulate(days=7, nodes=10, interval=600, seed=SEED),
+                   repeat=ctx.scale(5, 2), warmup=1, items=7 * 144 * 10)
+
+
+# =============== RUN / COMPARE ===============
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def run(pattern="*", quick=False):
+    results = {}
+    logging.disable(logging.WARNING)  # the offline path logs a warning per record
+    warnings.filterwarnings("ignore", category=UserWarning)  # xgboost parameter chatter
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # main.py and app/app.py open their rollup DB on import; keep it out of the repo
+            os.environ.setdefault("IRRIGATION_ROLLUP_DB", os.path.join(tmpdir, "rollups.db"))
+            ctx = Context(tmpdir, quick=quick)
+            for name, fn in BENCHMARKS.items():
+                if not fnmatch.fnmatch(name, pattern):
+                    continue
+                try:
+                    results[name] = fn(ctx)
+                    print(f"⏱️ {name:32s} median {results[name]['median_s'] * 1e3:9.3f} ms")
+                except ImportError as e:
+                    results[name] = {"skipped": f"missing dependency: {e}"}
+                    print(f"⚠️ {name:32s} skipped ({e})")
+    finally:
+        logging.disable(logging.NOTSET)
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Return (rows, regressions) comparing median times of two result files.
+    Raises ValueError for a quick run against a full one: fixtures differ in size.
+    """
+    modes = [r["meta"].get("quick", False) for r in (baseline, current)]
+    if modes[0] != modes[1]:
+        names = ["quick" if m else "full" for m in modes]
+        raise ValueError(f"cannot compare a {names[0]} baseline with a {names[1]} run; rerun with matching --quick")
+    rows, regressions = [], []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or "median_s" not in base or "median_s" not in cur:
+            rows.append((name, None, cur.get("median_s"), None, "new/skipped"))
+            continue
+        ratio = cur["median_s"] / base["median_s"] if base["median_s"] else float("inf")
+        status = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "ok")
+        rows.append((name, base["median_s"], cur["median_s"], ratio, status))
+        if status == "REGRESSION":
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Smart irrigation benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="run benchmarks and write a JSON result file")
+    p_run.add_argument("--out", default=os.path.join(ROOT, "benchmarks", "results", "current.json"))
+    p_run.add_argument("--only", default="*", help="glob on benchmark names, e.g. 'inference.*'")
+    p_run.add_argument("--quick", action="store_true", help="smaller fixtures and fewer repeats")
+
+    p_cmp = sub.add_parser("compare", help="compare a result file against a saved baseline")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        result = run(args.only, args.quick)
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Results saved: {args.out}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    try:
+        rows, regressions = compare(baseline, current, args.threshold)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    print(f"📏 {'quick' if current['meta'].get('quick') else 'full'} runs")
+    for name, base, cur, ratio, status in rows:
+        base_ms = f"{base * 1e3:9.3f}" if base is not None else "        -"
+        cur_ms = f"{cur * 1e3:9.3f}" if cur is not None else "        -"
+        ratio_s = f"{ratio:6.2f}x" if ratio is not None else "      -"
+        print(f"{name:32s} {base_ms} ms -> {cur_ms} ms {ratio_s}  {status}")
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("✅ No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
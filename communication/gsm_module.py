@@ -1,9 +1,14 @@
 import serial, time
 from datetime import datetime
 from utils.logger import get_logger
+from utils import metrics
 
 logger = get_logger("data/gsm.log")
 
+SMS_SECONDS = metrics.histogram("irrigation_gsm_send_seconds", "Time to send one SMS over the modem")
+SMS_PENDING = metrics.gauge("irrigation_gsm_pending", "SMS sends in progress (modem queue depth)")
+SMS_FAILURES = metrics.counter("irrigation_gsm_failures_total", "SMS sends that raised")
+
 # NOTE: change device path to your modem's serial device (check dmesg or /dev/ttyUSB*)
 SERIAL_PORT = "/dev/ttyUSB3"   # TODO: change to correct port
 BAUDRATE = 115200
@@ -13,23 +18,28 @@ def send_sms(phone_number, message, port=SERIAL_PORT):
     Sends SMS using AT commands. Keep message short.
     """
     try:
-        gsm = serial.Serial(port, baudrate=BAUDRATE, timeout=2)
-        time.sleep(0.5)
-        def write(cmd, wait=0.5):
-            gsm.write(cmd if isinstance(cmd, bytes) else str(cmd).encode('utf-8'))
-            time.sleep(wait)
-        write('AT\r\n', 0.5)
-        write('AT+CMGF=1\r\n', 0.5)   # text mode
-        write(f'AT+CMGS="{phone_number}"\r\n', 0.5)
-        # message terminated by Ctrl+Z
-        write(message)
-        write(bytes([26]), 0.5)
-        time.sleep(2)
-        logger.info("SMS sent to %s: %s", phone_number, message)
-        gsm.close()
+        with SMS_PENDING.track_inprogress(), SMS_SECONDS.time():
+            _send_sms(phone_number, message, port)
     except Exception as e:
+        SMS_FAILURES.inc()
         logger.exception("Failed to send SMS: %s", e)
         raise
+
+def _send_sms(phone_number, message, port):
+    gsm = serial.Serial(port, baudrate=BAUDRATE, timeout=2)
+    time.sleep(0.5)
+    def write(cmd, wait=0.5):
+        gsm.write(cmd if isinstance(cmd, bytes) else str(cmd).encode('utf-8'))
+        time.sleep(wait)
+    write('AT\r\n', 0.5)
+    write('AT+CMGF=1\r\n', 0.5)   # text mode
+    write(f'AT+CMGS="{phone_number}"\r\n', 0.5)
+    # message terminated by Ctrl+Z
+    write(message)
+    write(bytes([26]), 0.5)
+    time.sleep(2)
+    logger.info("SMS sent to %s: %s", phone_number, message)
+    gsm.close()
 def send_offline_alert(message):
     with open("data/outbox/alerts.txt", "a") as f:
         f.write(f"{datetime.now().isoformat()} - {message}\n")
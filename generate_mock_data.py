@@ -1,65 +1,258 @@
-import csv
-import random
+import argparse
+import os
 import time
 from datetime import datetime
 
-def generate_mock_data(num_samples=1000, delay=0.0):
+import numpy as np
+import pandas as pd
+
+# Column order of the original single-node dataset, plus node_id/irrigating.
+COLUMNS = [
+    "timestamp",
+    "node_id",
+    "soil_temp",
+    "air_temp",
+    "soil_moisture",
+    "humidity",
+    "light_intensity",
+    "irrigation_status",
+    "irrigating",
+]
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+SEEDED_START = datetime(2025, 1, 1)  # start used with a seed, so seeded runs are reproducible
+
+
+class SyntheticFieldGenerator:
+    """
+    Vectorized, seeded generator of correlated sensor data for many nodes.
+
+    Every node follows a diurnal air/soil temperature and light cycle, humidity
+    falls as air temperature rises, and soil moisture dries down at a rate driven
+    by temperature and light until it reaches the node's refill point, where
+    irrigation brings it back to field capacity. Moisture is computed as a
+    sawtooth over the cumulative water loss, so a whole chunk of time steps is
+    produced with a handful of NumPy operations and no per-row Python loop.
+    """
+
+    def __init__(self, num_nodes=1, interval_s=10, start=None, seed=None):
+        self.num_nodes = num_nodes
+        self.interval_s = interval_s
+        self.rng = np.random.default_rng(seed)
+        if start is None:
+            # The diurnal cycle depends on the start hour, so a seed alone must not mean "now"
+            start = SEEDED_START if seed is not None else datetime.now().replace(microsecond=0)
+        self.start = np.datetime64(start, "s")
+        self.start_hour = (self.start - self.start.astype("datetime64[D]")).astype(int) / 3600.0
+        self.step = 0
+
+        n = num_nodes
+        rng = self.rng
+        # Per-node climate and soil parameters
+        self.air_mean = rng.uniform(24, 32, n)
+        self.air_amp = rng.uniform(4, 8, n)
+        self.soil_offset = rng.uniform(-4, -1, n)
+        self.light_peak = rng.uniform(700, 1200, n)
+        self.field_capacity = rng.uniform(70, 85, n)
+        self.refill_point = rng.uniform(20, 30, n)
+        self.dry_rate = rng.uniform(0.8, 1.6, n)  # % moisture lost per hour at 25 °C
+        # Water already lost since the last refill, carried across chunks
+        self.depletion = rng.uniform(0, 1, n) * (self.field_capacity - self.refill_point)
+
+    def generate(self, num_steps):
+        """Return a dict of flat column arrays for the next ``num_steps`` time steps."""
+        n = self.num_nodes
+        rng = self.rng
+        steps = np.arange(self.step, self.step + num_steps)
+        hod = ((self.start_hour + steps * self.interval_s / 3600.0) % 24)[:, None]  # (steps, 1)
+
+        air_temp = (
+            self.air_mean
+            + self.air_amp * np.sin(2 * np.pi * (hod - 9) / 24)
+            + rng.normal(0, 0.4, (num_steps, n))
+        )
+        soil_temp = (
+            self.air_mean + self.soil_offset
+            + 0.4 * self.air_amp * np.sin(2 * np.pi * (hod - 12) / 24)
+            + rng.normal(0, 0.15, (num_steps, n))
+        )
+        daylight = np.clip(np.sin(np.pi * (hod - 6) / 12), 0, None)
+        light = np.clip(self.light_peak * daylight + rng.normal(0, 15, (num_steps, n)), 0, None)
+        humidity = np.clip(
+            90 - 2.2 * (air_temp - self.air_mean + self.air_amp) + rng.normal(0, 2, (num_steps, n)),
+            25, 100,
+        )
+
+        # Evapotranspiration-driven loss per step, then sawtooth between capacity and refill point
+        loss = self.dry_rate * (1 + 0.06 * (air_temp - 25) + 0.4 * light / 1000.0)
+        loss = np.clip(loss, 0.05, None) * (self.interval_s / 3600.0)
+        span = self.field_capacity - self.refill_point
+        cumulative = self.depletion + np.cumsum(loss, axis=0)
+        cycles = np.floor(cumulative / span)
+        soil_moisture = self.field_capacity - (cumulative - cycles * span)
+        prev_cycles = np.vstack([np.floor(self.depletion / span)[None, :], cycles[:-1]])
+        irrigating = (cycles > prev_cycles).astype(np.int8)
+        soil_moisture = np.clip(soil_moisture + rng.normal(0, 0.3, (num_steps, n)), 0, 100)
+        self.depletion = cumulative[-1] - cycles[-1] * span
+
+        # 0 = Normal, 1 = Under-irrigated, 2 = Over-irrigated (same labels as before)
+        irrigation_status = np.where(soil_moisture < 30, 1, np.where(soil_moisture > 70, 2, 0)).astype(np.int8)
+
+        timestamps = self.start + (steps * self.interval_s).astype("timedelta64[s]")
+        self.step += num_steps
+        return {
+            "timestamp": np.repeat(timestamps, n),
+            "node_id": np.tile(np.arange(n, dtype=np.int32), num_steps),
+            "soil_temp": np.round(soil_temp, 2).ravel(),
+            "air_temp": np.round(air_temp, 2).ravel(),
+            "soil_moisture": np.round(soil_moisture, 2).ravel(),
+            "humidity": np.round(humidity, 2).ravel(),
+            "light_intensity": np.round(light, 2).ravel(),
+            "irrigation_status": irrigation_status.ravel(),
+            "irrigating": irrigating.ravel(),
+        }
+
+    def chunks(self, total_rows, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Yield column dicts of roughly ``chunk_rows`` rows until ``total_rows`` are produced."""
+        steps_per_chunk = max(1, chunk_rows // self.num_nodes)
+        remaining = total_rows
+        while remaining > 0:
+            steps = min(steps_per_chunk, -(-remaining // self.num_nodes))
+            chunk = self.generate(steps)
+            rows = steps * self.num_nodes
+            if rows > remaining:  # trim the final partial time step
+                chunk = {k: v[:remaining] for k, v in chunk.items()}
+                rows = remaining
+            yield chunk
+            remaining -= rows
+
+
+# =============== OUTPUT ===============
+def write_chunks(chunks, path, fmt="csv"):
+    """Stream chunks to ``path`` as CSV, Parquet (needs pyarrow) or a directory of .npz files."""
+    total = 0
+    if fmt == "csv":
+        header = True
+        for chunk in chunks:
+            pd.DataFrame(chunk, columns=COLUMNS).to_csv(
+                path, mode="w" if header else "a", header=header, index=False,
+                date_format="%Y-%m-%d %H:%M:%S",
+            )
+            header = False
+            total += len(chunk["timestamp"])
+    elif fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pydict(chunk)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                total += table.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+    elif fmt == "npz":
+        os.makedirs(path, exist_ok=True)
+        for i, chunk in enumerate(chunks):
+            np.savez(os.path.join(path, f"chunk_{i:05d}.npz"), **chunk)
+            total += len(chunk["timestamp"])
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return total
+
+
+# =============== LOAD GENERATOR ===============
+def _pipeline_sink(record):
+    """Default replay target: the controller's decision + upload/offline path."""
+    import main
+    decision = main.decide_irrigation(record, node_id=record["node_id"])
+    row = {k: record[k] for k in ("timestamp", "soil_temp", "air_temp", "soil_moisture", "humidity", "light")}
+    main.upload_to_supabase({**row, "decision": decision})
+
+
+def replay(chunks, rate, sink=None, duration=None):
+    """
+    Feed generated rows into ``sink(record)`` at ``rate`` rows per second.
+
+    ``sink`` defaults to ``main.decide_irrigation`` + ``main.upload_to_supabase``
+    so the live ingestion path is exercised. Returns (rows sent, achieved rate).
+    """
+    sink = sink or _pipeline_sink
+    sent = 0
+    started = time.perf_counter()
+    for chunk in chunks:
+        chunk = dict(chunk)
+        chunk["timestamp"] = np.datetime_as_string(chunk["timestamp"], unit="s")
+        records = pd.DataFrame(chunk, columns=COLUMNS).rename(
+            columns={"light_intensity": "light"}
+        ).to_dict("records")
+        for record in records:
+            sink(record)
+            sent += 1
+            ahead = sent / rate - (time.perf_counter() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+            if duration and time.perf_counter() - started >= duration:
+                return sent, sent / (time.perf_counter() - started)
+    elapsed = time.perf_counter() - started
+    return sent, sent / elapsed if elapsed else 0.0
+
+
+def _paced(chunks, delay):
+    """Pause ``delay`` seconds per row after each chunk has been consumed."""
+    for chunk in chunks:
+        yield chunk
+        time.sleep(delay * len(chunk["timestamp"]))
+
+
+def generate_mock_data(num_samples=1000, delay=0.0, num_nodes=1, seed=None,
+                       path="sensor_data.csv", fmt="csv", chunk_rows=DEFAULT_CHUNK_ROWS, start=None):
     """
     Generate mock sensor data for smart irrigation project.
-    Saves data to 'sensor_data.csv'
+    Saves data to 'sensor_data.csv' by default; with ``delay`` > 0 the file
+    grows one time step at a time, ``delay`` seconds per row.
     """
+    generator = SyntheticFieldGenerator(num_nodes=num_nodes, seed=seed, start=start)
+    if delay > 0:
+        chunks = _paced(generator.chunks(num_samples, num_nodes), delay)
+    else:
+        chunks = generator.chunks(num_samples, chunk_rows)
+
+    started = time.perf_counter()
+    total = write_chunks(chunks, path, fmt)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Mock dataset generated: {path} ({total} samples, {num_nodes} nodes, "
+          f"{total / elapsed:,.0f} rows/s)")
+    return total
 
-    # Define realistic environmental ranges
-    soil_temp_range = (15, 38)       # °C
-    air_temp_range = (18, 42)        # °C
-    soil_moisture_range = (10, 90)   # %
-    humidity_range = (30, 95)        # %
-    light_range = (100, 1200)        # Lux
-
-    # Open CSV file
-    with open("sensor_data.csv", "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([
-            "timestamp",
-            "soil_temp",
-            "air_temp",
-            "soil_moisture",
-            "humidity",
-            "light_intensity",
-            "irrigation_status"
-        ])
-
-        for _ in range(num_samples):
-            soil_temp = round(random.uniform(*soil_temp_range), 2)
-            air_temp = round(random.uniform(*air_temp_range), 2)
-            soil_moisture = round(random.uniform(*soil_moisture_range), 2)
-            humidity = round(random.uniform(*humidity_range), 2)
-            light = round(random.uniform(*light_range), 2)
-
-            # Generate irrigation status label
-            # 0 = Normal, 1 = Under-irrigated, 2 = Over-irrigated
-            if soil_moisture < 30:
-                irrigation_status = 1  # Under-irrigated
-            elif soil_moisture > 70:
-                irrigation_status = 2  # Over-irrigated
-            else:
-                irrigation_status = 0  # Normal
-
-            writer.writerow([
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                soil_temp,
-                air_temp,
-                soil_moisture,
-                humidity,
-                light,
-                irrigation_status
-            ])
-
-            if delay > 0:
-                time.sleep(delay)
-
-    print(f"✅ Mock dataset generated: sensor_data.csv ({num_samples} samples)")
 
 if __name__ == "__main__":
-    # Generate 1000 samples instantly
-    generate_mock_data(num_samples=1000, delay=0)
+    parser = argparse.ArgumentParser(description="Generate synthetic smart irrigation sensor data.")
+    parser.add_argument("--rows", type=int, default=1000, help="total rows to generate")
+    parser.add_argument("--nodes", type=int, default=1, help="number of sensor nodes")
+    parser.add_argument("--interval", type=int, default=10, help="seconds between samples")
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for reproducible data")
+    parser.add_argument("--start", type=datetime.fromisoformat, default=None,
+                        help="timestamp of the first sample, e.g. 2025-06-01T06:00 "
+                             f"(default: now, or {SEEDED_START:%Y-%m-%d} with --seed)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--format", choices=["csv", "parquet", "npz"], default="csv")
+    parser.add_argument("--out", default="sensor_data.csv")
+    parser.add_argument("--replay-rate", type=float, default=0,
+                        help="rows/s to feed into the live pipeline instead of writing a file")
+    parser.add_argument("--duration", type=float, default=None, help="stop replay after N seconds")
+    args = parser.parse_args()
+
+    gen = SyntheticFieldGenerator(num_nodes=args.nodes, interval_s=args.interval, seed=args.seed, start=args.start)
+    stream = gen.chunks(args.rows, args.chunk_rows)
+    if args.replay_rate > 0:
+        n, achieved = replay(stream, args.replay_rate, duration=args.duration)
+        print(f"✅ Replayed {n} rows at {achieved:.1f} rows/s")
+    else:
+        t0 = time.perf_counter()
+        n = write_chunks(stream, args.out, args.format)
+        print(f"✅ Mock dataset generated: {args.out} ({n} samples, {args.nodes} nodes, "
+              f"{n / (time.perf_counter() - t0):,.0f} rows/s)")
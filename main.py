@@ -1,5 +1,5 @@
 import os
-import time
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime, timezone
@@ -7,6 +7,13 @@ from xgboost import XGBClassifier
 import joblib
 import random
 from supabase import create_client, Client
+from models.decision_cache import DecisionCache
+from utils import metrics
+from utils.dedup import DedupIndex, DUPLICATE, LABEL_MERGED, journal_label, label_column_of, row_label
+from utils.rollups import RollupEngine
+from utils.shared_state import ShmRingWriter
+from models.drift_monitor import DriftMonitor, check_retrain, retrain_in_background
+from utils.clock import SYSTEM_CLOCK
 
 # =============== CONFIG ===============
 MODEL_PATH = "models/irrigation_xgb_model.pkl"
@@ -16,6 +23,9 @@ SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc3MiOiJzdXBhYmFzZSIsInJ
 
 OFFLINE_BACKUP = "offline_backup.csv"
 UPLOAD_INTERVAL = 10  # seconds
+INGEST_INDEX_KEYS = 100_000  # keys per dedup generation (~11 days of 10 s readings)
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9108"))  # 0 disables /metrics
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")  # 0.0.0.0 to let a remote Prometheus scrape
 
 # =============== LOGGING ===============
 logging.basicConfig(
@@ -31,19 +41,75 @@ except Exception as e:
     supabase = None
     logging.warning(f"⚠️ Could not initialize Supabase: {e}")
 
+# =============== METRICS ===============
+SENSOR_READ_SECONDS = metrics.histogram("irrigation_sensor_read_seconds", "Time to read one set of sensor values")
+FEATURE_BUILD_SECONDS = metrics.histogram("irrigation_feature_build_seconds", "Time to build the model feature vector")
+PREDICT_SECONDS = metrics.histogram("irrigation_predict_seconds", "Time spent in model.predict")
+UPLOAD_SECONDS = metrics.histogram("irrigation_upload_seconds", "Time to upload one record (including offline fallback)")
+CSV_WRITE_SECONDS = metrics.histogram("irrigation_csv_write_seconds", "Time to append rows to a CSV file", ["file"])
+UPLOAD_FAILURES = metrics.counter("irrigation_upload_failures_total", "Uploads that fell back to the offline backup")
+DECISIONS = metrics.counter("irrigation_decisions_total", "Irrigation decisions made", ["decision"])
+OFFLINE_BACKLOG = metrics.gauge("irrigation_offline_backlog_rows", "Rows waiting in the offline backup file")
+
+
+def _count_backlog():
+    if not os.path.exists(OFFLINE_BACKUP):
+        return 0
+    with open(OFFLINE_BACKUP, "rb") as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+OFFLINE_BACKLOG.set(_count_backlog())
+DUPLICATES_DROPPED = metrics.counter("irrigation_duplicates_dropped_total", "Readings dropped as duplicates at ingestion")
+LABELS_MERGED = metrics.counter("irrigation_labels_merged_total", "Late labels applied to an already stored reading")
+
+# Keys of every reading already uploaded or spooled, so retries/replays are not stored twice
+ingest_index = DedupIndex(OFFLINE_BACKUP + ".idx", max_keys=INGEST_INDEX_KEYS)
+
+# =============== ROLLUPS ===============
+ROLLUP_DB = os.environ.get("IRRIGATION_ROLLUP_DB", "data/rollups.db")
+rollups = RollupEngine(ROLLUP_DB)
+
 # =============== LOAD MODEL ===============
 try:
     model = joblib.load(MODEL_PATH)
+    model_mtime = os.path.getmtime(MODEL_PATH)
     logging.info("✅ XGBoost model loaded successfully")
 except Exception as e:
     model = None
+    model_mtime = None
     logging.error(f"❌ Failed to load model: {e}")
 
+# =============== DRIFT MONITOR ===============
+DRIFT_PSI = metrics.gauge("irrigation_drift_max_psi", "Largest per-feature PSI against the training profile")
+DRIFT_TRIGGERS = metrics.counter("irrigation_drift_retrains_total", "Retrains triggered by drift")
+
+
+def _on_drift(report):
+    what = ", ".join(report["drifted_features"]) or "predicted-positive rate"
+    logging.warning(f"📉 Drift detected ({what}); retraining in background...")
+    DRIFT_TRIGGERS.inc()
+    retrain_in_background(list(drift_monitor.recent))
+
+
+def _load_drift_monitor(previous=None):
+    """Monitor for the current reference profile; keeps ``previous`` if it can't be read."""
+    try:
+        monitor = DriftMonitor.from_file(on_drift=_on_drift)
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"❌ Failed to load drift reference profile: {e}")
+        return previous
+    # The retrain cooldown must survive a reload, or drift re-triggers after min_samples
+    return monitor.carry_over(previous) if monitor else None
+
+
+drift_monitor = _load_drift_monitor()
+
 # =============== MOCK SENSOR DATA ===============
-def read_sensor_data():
+def read_sensor_data(clock=SYSTEM_CLOCK):
     """Simulate live sensor data readings."""
     return {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": datetime.fromtimestamp(clock(), timezone.utc).isoformat(),
         "soil_temp": round(random.uniform(15, 35), 2),
         "air_temp": round(random.uniform(20, 40), 2),
         "soil_moisture": round(random.uniform(10, 90), 2),
@@ -54,6 +120,13 @@ def read_sensor_data():
 # =============== UPLOAD / BACKUP HANDLING ===============
 def upload_to_supabase(data):
     """Upload to Supabase or store locally if offline."""
+    status = ingest_index.classify(data)
+    if status == DUPLICATE:
+        DUPLICATES_DROPPED.inc()
+        logging.info("♻️ Duplicate reading dropped.")
+        return True
+    if status == LABEL_MERGED:
+        return merge_label(data)
     try:
         if not supabase:
             raise ConnectionError("Supabase client not initialized")
@@ -61,57 +134,215 @@ def upload_to_supabase(data):
         response = supabase.table("sensor_readings").insert(data).execute()
         if response.data:
             logging.info("📤 Data uploaded to Supabase successfully.")
-            return True
+            uploaded = True
         else:
             raise Exception("Supabase returned no data")
     except Exception as e:
         logging.warning(f"⚠️ Upload failed ({e}). Saving offline...")
-        pd.DataFrame([data]).to_csv(OFFLINE_BACKUP, mode="a", header=not os.path.exists(OFFLINE_BACKUP), index=False)
-        return False
+        UPLOAD_FAILURES.inc()
+        with CSV_WRITE_SECONDS.labels(file="offline_backup").time():
+            pd.DataFrame([data]).to_csv(OFFLINE_BACKUP, mode="a", header=not os.path.exists(OFFLINE_BACKUP), index=False)
+        OFFLINE_BACKLOG.inc()
+        uploaded = False
+    # Only remember the reading once it is stored somewhere, so a crash before that can't lose it
+    ingest_index.record(data)
+    ingest_index.flush()
+    return uploaded
+
+
+def merge_label(data):
+    """A labelled copy of a stored reading: set the label on that row instead of inserting a second one."""
+    column = label_column_of(data)
+    try:
+        if not supabase:
+            raise ConnectionError("Supabase client not initialized")
+
+        query = supabase.table("sensor_readings").update({column: row_label(data)}).eq("timestamp", data["timestamp"])
+        if "node_id" in data:
+            query = query.eq("node_id", data["node_id"])
+        response = query.execute()
+        if response.data:
+            logging.info("🏷️ Label merged into the uploaded reading.")
+            uploaded = True
+        else:
+            raise Exception("no uploaded row matched")  # the reading is still in the offline backup
+    except Exception as e:
+        logging.warning(f"⚠️ Label update failed ({e}). Saving to the offline label journal...")
+        journal_label(OFFLINE_BACKUP, data)
+        uploaded = False
+    LABELS_MERGED.inc()
+    ingest_index.record(data)
+    ingest_index.flush()
+    return uploaded
 
 
 # =============== DECISION ENGINE ===============
-def decide_irrigation(sensor_data):
-    """Use trained ML model to decide irrigation need."""
+def _predict_irrigation(sensor_data):
+    """Run the trained ML model on one (quantized) reading."""
+    with FEATURE_BUILD_SECONDS.time():
+        features = [
+            sensor_data["soil_temp"],
+            sensor_data["air_temp"],
+            sensor_data["soil_moisture"],
+            sensor_data["humidity"],
+            sensor_data["light"],
+            sensor_data["air_temp"] - sensor_data["soil_temp"],
+            sensor_data["humidity"] / (sensor_data["soil_moisture"] + 1)
+        ]
+
+    with PREDICT_SECONDS.time():
+        prediction = model.predict([features])[0]
+    return "IRRIGATION" if prediction == 1 else "NO_IRRIGATION"
+
+
+decision_cache = DecisionCache(_predict_irrigation)
+
+for _stat in ("hits", "misses", "skips"):
+    metrics.gauge(f"irrigation_decision_cache_{_stat}", f"Decision cache {_stat} since start", ["cache"]).labels(
+        cache="controller").set_function(lambda s=_stat: decision_cache.stats()[s])
+
+
+def decide_irrigation(sensor_data, node_id="default"):
+    """Use trained ML model to decide irrigation need (memoized per node)."""
     if not model:
         return "MODEL_NOT_AVAILABLE"
+    return decision_cache.decide(sensor_data, node_id=sensor_data.get("node_id", node_id))
 
-    features = [
-        sensor_data["soil_temp"],
-        sensor_data["air_temp"],
-        sensor_data["soil_moisture"],
-        sensor_data["humidity"],
-        sensor_data["light"],
-        sensor_data["air_temp"] - sensor_data["soil_temp"],
-        sensor_data["humidity"] / (sensor_data["soil_moisture"] + 1)
-    ]
-
-    prediction = model.predict([features])[0]
-    return "IRRIGATION" if prediction == 1 else "NO_IRRIGATION"
+
+def decide_irrigation_batch(readings):
+    """Decide for many readings with a single model call (bypasses the cache)."""
+    if not model:
+        return ["MODEL_NOT_AVAILABLE"] * len(readings)
+
+    with FEATURE_BUILD_SECONDS.time():
+        base = np.array([
+            [r["soil_temp"], r["air_temp"], r["soil_moisture"], r["humidity"], r["light"]]
+            for r in readings
+        ], dtype=float).reshape(-1, 5)
+        temp_diff = base[:, 1] - base[:, 0]
+        humidity_ratio = base[:, 3] / (base[:, 2] + 1)
+        features = np.column_stack([base, temp_diff, humidity_ratio])
+
+    with PREDICT_SECONDS.time():
+        predictions = model.predict(features)
+    return ["IRRIGATION" if p == 1 else "NO_IRRIGATION" for p in predictions]
+
+
+def decide_irrigation_many(readings):
+    """Decide for all readings of one tick (one per node): cached, misses in one model call."""
+    if not model:
+        return ["MODEL_NOT_AVAILABLE"] * len(readings)
+    return decision_cache.decide_many(readings, decide_irrigation_batch)
+
+
+def maybe_reload_model():
+    """Pick up a model written by a (drift-triggered) retrain."""
+    global model, model_mtime, drift_monitor
+    check_retrain()
+    try:
+        mtime = os.path.getmtime(MODEL_PATH)
+    except OSError:
+        return False
+    if mtime == model_mtime:
+        return False
+    try:
+        model = joblib.load(MODEL_PATH)
+    except Exception as e:
+        logging.error(f"❌ Failed to reload model: {e}")
+        return False
+    model_mtime = mtime
+    decision_cache.clear()
+    drift_monitor = _load_drift_monitor(drift_monitor)
+    logging.info("🔄 Reloaded retrained model and reference profile")
+    return True
 
 
 # =============== MAIN LOOP ===============
-def main_loop():
+def main_loop(clock=SYSTEM_CLOCK, read_fn=None, sink=None, decide_fn=None,
+              interval=UPLOAD_INTERVAL, max_ticks=None, rollup_engine=None, simulation=False):
+    """
+    Read -> decide -> record -> upload, every ``interval`` seconds of ``clock``.
+
+    ``decide_fn`` maps the list of readings of one tick to their decisions.
+    The defaults run the real controller. For a simulation pass a
+    ``VirtualClock``, a ``read_fn`` returning a list of readings per tick
+    (e.g. ``SoilWaterBalance.read``), a local upload ``sink`` and
+    ``simulation=True``, which keeps the run away from the shared-memory ring
+    and the drift-triggered retraining of the live model.
+    """
     logging.info("🌱 Starting Smart Irrigation System (Supabase Integrated)...")
 
-    while True:
-        sensor_data = read_sensor_data()
-        decision = decide_irrigation(sensor_data)
+    live = None
+    if not simulation:
+        # Live state for the dashboard/API processes (read-only attach, no extra sampling)
+        try:
+            live = ShmRingWriter()
+            logging.info(f"🔗 Publishing live state to shared memory '{live.shm.name}'")
+        except OSError as e:
+            logging.warning(f"⚠️ Shared memory unavailable ({e}); dashboards will sample on their own.")
+
+    rollup_engine = rollup_engine or rollups
+    try:
+        return _run(
+            live,
+            clock=clock,
+            read_fn=read_fn or (lambda: [read_sensor_data(clock)]),
+            sink=sink or upload_to_supabase,
+            decide_fn=decide_fn or decide_irrigation_many,
+            interval=interval,
+            max_ticks=max_ticks,
+            rollup_engine=rollup_engine,
+            monitor_drift=not simulation,
+        )
+    finally:
+        rollup_engine.flush()  # open buckets are otherwise only written every FLUSH_INTERVAL
+        if live is not None:
+            live.close()
+
+
+def _run(live, clock, read_fn, sink, decide_fn, interval, max_ticks, rollup_engine, monitor_drift):
+    """Controller loop; returns the number of decisions made once ``max_ticks`` is reached."""
+    ticks = decisions = 0
+    while max_ticks is None or ticks < max_ticks:
+        with SENSOR_READ_SECONDS.time():
+            readings = read_fn()
+        maybe_reload_model()
+        for sensor_data, decision in zip(readings, decide_fn(readings)):
+            DECISIONS.labels(decision=decision).inc()
+            decisions += 1
+            if monitor_drift and drift_monitor is not None:
+                report = drift_monitor.update(sensor_data, decision == "IRRIGATION")
+                if report:
+                    DRIFT_PSI.set(max(f["psi"] for f in report["features"].values()))
 
-        msg = f"💧 {decision.replace('_', ' ')} | Soil Moisture={sensor_data['soil_moisture']}"
-        logging.info(f"[{sensor_data['timestamp']}] {msg}")
+            msg = f"💧 {decision.replace('_', ' ')} | Soil Moisture={sensor_data['soil_moisture']}"
+            logging.info(f"[{sensor_data['timestamp']}] {msg}")
 
-        record = {
-            **sensor_data,
-            "decision": decision,
-        }
+            record = {
+                **sensor_data,
+                "decision": decision,
+            }
+            rollup_engine.add(record)
+            if live is not None:
+                live.publish(record)
 
-        upload_to_supabase(record)
-        time.sleep(UPLOAD_INTERVAL)
+            with UPLOAD_SECONDS.time():
+                sink(record)
+        ticks += 1
+        clock.sleep(interval)
+    return decisions
 
 
 # =============== ENTRY POINT ===============
 if __name__ == "__main__":
+    if METRICS_PORT:
+        try:
+            metrics.start_http_server(METRICS_PORT, host=METRICS_HOST)
+            logging.info(f"📈 Metrics on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            # e.g. the port is taken by another instance; irrigation must keep running
+            logging.error(f"❌ Metrics server not started on {METRICS_HOST}:{METRICS_PORT}: {e}")
+    metrics.install_profiler_signal()
     try:
         main_loop()
     except KeyboardInterrupt:
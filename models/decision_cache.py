@@ -0,0 +1,168 @@
+"""
+Decision memoization for the irrigation models.
+
+Soil conditions change slowly, so most samples map to a decision we have
+already computed. Readings are quantized to sensor resolution and looked up
+in a bounded LRU; per node, a reading that has not moved past the delta
+thresholds since the last inference reuses that node's last decision without
+touching the model at all.
+"""
+import threading
+from collections import OrderedDict
+
+FEATURE_KEYS = ["soil_temp", "air_temp", "soil_moisture", "humidity", "light"]
+
+# Resolution of the sensors we ship with (DS18B20, SHT31-D, SEN0193, BH1750),
+# rounded up to what is meaningful for an irrigation decision.
+SENSOR_RESOLUTION = {
+    "soil_temp": 0.5,      # °C
+    "air_temp": 0.5,       # °C
+    "soil_moisture": 1.0,  # %
+    "humidity": 1.0,       # %
+    "light": 10.0,         # Lux
+}
+
+# A node whose readings all moved less than this since its last inference
+# keeps its previous decision.
+DELTA_THRESHOLD = dict(SENSOR_RESOLUTION)
+
+DEFAULT_MAXSIZE = 4096
+
+
+class DecisionCache:
+    """Wrap a ``decide_fn(sensor_data)`` with quantization, an LRU and per-node skipping."""
+
+    def __init__(self, decide_fn, resolution=None, delta_threshold=None, maxsize=DEFAULT_MAXSIZE):
+        self.decide_fn = decide_fn
+        self.resolution = resolution or SENSOR_RESOLUTION
+        self.delta_threshold = DELTA_THRESHOLD if delta_threshold is None else delta_threshold
+        self.maxsize = maxsize
+        self._cache = OrderedDict()
+        self._last = {}  # node_id -> (anchor reading, decision)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skips = 0
+        self.evictions = 0
+
+    def quantize(self, sensor_data):
+        """Return the cache key: each feature snapped to its sensor resolution."""
+        return tuple(
+            int(round(float(sensor_data[k]) / self.resolution[k])) for k in FEATURE_KEYS
+        )
+
+    def _dequantize(self, key, sensor_data):
+        quantized = dict(sensor_data)
+        for k, q in zip(FEATURE_KEYS, key):
+            quantized[k] = round(q * self.resolution[k], 4)
+        return quantized
+
+    def _unchanged(self, anchor, sensor_data):
+        if not self.delta_threshold:
+            return False
+        for k in FEATURE_KEYS:
+            if abs(float(sensor_data[k]) - anchor[k]) >= self.delta_threshold.get(k, 0):
+                return False
+        return True
+
+    def decide(self, sensor_data, node_id="default"):
+        """Return the decision for ``sensor_data``, running the model only when needed."""
+        with self._lock:
+            last = self._last.get(node_id)
+            if last is not None and self._unchanged(last[0], sensor_data):
+                self.skips += 1
+                return last[1]
+
+            key = self.quantize(sensor_data)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                decision = self._cache[key]
+                self.hits += 1
+            else:
+                decision = None
+
+        if decision is None:
+            # Run the model outside the lock; a racing duplicate miss is harmless.
+            decision = self.decide_fn(self._dequantize(key, sensor_data))
+            with self._lock:
+                self.misses += 1
+                self._cache[key] = decision
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+
+        with self._lock:
+            anchor = {k: float(sensor_data[k]) for k in FEATURE_KEYS}
+            self._last[node_id] = (anchor, decision)
+        return decision
+
+    def decide_many(self, readings, batch_fn, node_ids=None):
+        """
+        Decide for several readings (e.g. one per node in the same tick) with at
+        most one ``batch_fn(list_of_readings)`` call for all cache misses.
+        """
+        node_ids = node_ids or [r.get("node_id", "default") for r in readings]
+        decisions = [None] * len(readings)
+        skipped = [False] * len(readings)
+        missing = OrderedDict()  # key -> indices of readings that need it
+        with self._lock:
+            for i, (sensor_data, node_id) in enumerate(zip(readings, node_ids)):
+                last = self._last.get(node_id)
+                if last is not None and self._unchanged(last[0], sensor_data):
+                    self.skips += 1
+                    decisions[i] = last[1]
+                    skipped[i] = True
+                    continue
+                key = self.quantize(sensor_data)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    decisions[i] = self._cache[key]
+                    self.hits += 1
+                elif key in missing:
+                    missing[key].append(i)
+                    self.hits += 1
+                else:
+                    missing[key] = [i]
+
+        if missing:
+            keys = list(missing)
+            computed = batch_fn([self._dequantize(k, readings[missing[k][0]]) for k in keys])
+            with self._lock:
+                for key, decision in zip(keys, computed):
+                    self.misses += 1
+                    self._cache[key] = decision
+                    self._cache.move_to_end(key)
+                    for i in missing[key]:
+                        decisions[i] = decision
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+                    self.evictions += 1
+
+        with self._lock:
+            # Skipped readings keep the old anchor, so a slow trend still adds up past the threshold
+            for sensor_data, node_id, decision, skip in zip(readings, node_ids, decisions, skipped):
+                if not skip:
+                    self._last[node_id] = ({k: float(sensor_data[k]) for k in FEATURE_KEYS}, decision)
+        return decisions
+
+    def clear(self):
+        """Drop cached decisions, e.g. after the model is reloaded."""
+        with self._lock:
+            self._cache.clear()
+            self._last.clear()
+
+    def stats(self):
+        """Return hit/miss/skip counters and the current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.skips
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "skips": self.skips,
+                "evictions": self.evictions,
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+                "nodes": len(self._last),
+                "hit_rate": round((self.hits + self.skips) / lookups, 4) if lookups else 0.0,
+            }
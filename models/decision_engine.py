@@ -2,6 +2,11 @@ import os
 import joblib
 import numpy as np
 
+from models.decision_cache import DecisionCache
+from utils import metrics
+
+PREDICT_SECONDS = metrics.histogram("irrigation_predict_seconds", "Time spent in model.predict")
+
 # Try loading trained model if available
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "irrigation_model.pkl")
 
@@ -15,12 +20,7 @@ if os.path.exists(MODEL_PATH):
 else:
     print("⚠️ Model file not found; using rule-based fallback.")
 
-def decide_irrigation(data):
-    """
-    Decide if irrigation is needed.
-    Input: dict with keys ['soil_temp', 'air_temp', 'soil_moisture', 'humidity', 'light']
-    Output: 1 = irrigation needed, 0 = not needed
-    """
+def _decide_uncached(data):
     if model:
         try:
             features = np.array([
@@ -30,7 +30,8 @@ def decide_irrigation(data):
                 data["humidity"],
                 data["light"]
             ]).reshape(1, -1)
-            prediction = model.predict(features)[0]
+            with PREDICT_SECONDS.time():
+                prediction = model.predict(features)[0]
             return int(prediction)
         except Exception as e:
             print(f"⚠️ Model prediction failed, using fallback. ({e})")
@@ -44,3 +45,20 @@ def decide_irrigation(data):
         return 1  # Hot and dry conditions
     else:
         return 0  # Default: not needed
+
+
+decision_cache = DecisionCache(_decide_uncached)
+
+for _stat in ("hits", "misses", "skips"):
+    metrics.gauge(f"irrigation_decision_cache_{_stat}", f"Decision cache {_stat} since start", ["cache"]).labels(
+        cache="decision_engine").set_function(lambda s=_stat: decision_cache.stats()[s])
+
+
+def decide_irrigation(data, node_id="default"):
+    """
+    Decide if irrigation is needed.
+    Input: dict with keys ['soil_temp', 'air_temp', 'soil_moisture', 'humidity', 'light']
+           (optionally 'node_id' to track each node separately)
+    Output: 1 = irrigation needed, 0 = not needed
+    """
+    return decision_cache.decide(data, node_id=data.get("node_id", node_id))
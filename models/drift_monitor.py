@@ -0,0 +1,270 @@
+"""
+Streaming drift monitor that triggers retraining only when it is needed.
+
+``train_model.train_xgboost_model`` saves a reference profile: fixed-bin
+histograms of the 7 model features and the predicted-positive rate on the
+training data. ``DriftMonitor`` keeps exponentially decayed histograms over
+the same bins for live traffic (O(1) per update, memory fixed by the bin
+count), compares them to the reference with PSI and a histogram KS distance,
+and calls ``on_drift`` once drift crosses a threshold. The monitor keeps the
+last readings it saw so the retrain it triggers can include them; otherwise a
+retrain on the same files would rebuild the same profile and drift again.
+"""
+import bisect
+import csv
+import json
+import logging
+import math
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+FEATURES = ["soil_temp", "air_temp", "soil_moisture", "humidity", "light", "temp_diff", "humidity_ratio"]
+REFERENCE_PATH = "models/reference_profile.json"
+NUM_BINS = 20
+
+PSI_THRESHOLD = 0.25          # > 0.25 is the usual "significant shift" cut-off
+KS_THRESHOLD = 0.2
+POSITIVE_RATE_THRESHOLD = 0.15
+MIN_SAMPLES = 500             # don't judge drift on a handful of readings
+CHECK_EVERY = 100             # evaluate every N updates (amortised O(1))
+HALF_LIFE = 5000              # samples for a reading's weight to halve
+COOLDOWN_S = 6 * 3600         # minimum time between retrain triggers
+RECENT_SIZE = 5000            # live readings kept to retrain on
+LIVE_DATA_PATH = "data/live_readings.csv"  # picked up by train_model.load_all_data
+
+_EPS = 1e-4
+_RESCALE_AT = 1e100
+
+
+def feature_vector(reading):
+    """The 7 model features, derived the same way as in training."""
+    soil_temp, air_temp = float(reading["soil_temp"]), float(reading["air_temp"])
+    moisture, humidity = float(reading["soil_moisture"]), float(reading["humidity"])
+    return [soil_temp, air_temp, moisture, humidity, float(reading["light"]),
+            air_temp - soil_temp, humidity / (moisture + 1)]
+
+
+# =============== REFERENCE PROFILE ===============
+def build_reference_profile(X, predictions, num_bins=NUM_BINS):
+    """
+    Histogram each feature column of ``X`` (DataFrame or 2-D array, FEATURES order)
+    over quantile-based inner edges; the outer bins are open-ended.
+    """
+    import numpy as np
+    X = np.asarray(X, dtype=float)
+    profile = {"created": datetime.now().isoformat(), "samples": int(len(X)), "features": {}}
+    for i, name in enumerate(FEATURES):
+        col = X[:, i][~np.isnan(X[:, i])]
+        edges = np.unique(np.quantile(col, np.linspace(0, 1, num_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, col, side="right"), minlength=len(edges) + 1)
+        profile["features"][name] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    profile["positive_rate"] = float(np.mean(np.asarray(predictions) == 1))
+    return profile
+
+
+def save_reference_profile(X, predictions, path=REFERENCE_PATH):
+    profile = build_reference_profile(X, predictions)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(profile, f)
+    os.replace(path + ".tmp", path)  # readers never see a partial file
+    return profile
+
+
+def load_reference_profile(path=REFERENCE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# =============== DISTANCES ===============
+def psi(expected, actual):
+    """Population stability index between two count vectors over the same bins."""
+    e_total, a_total = sum(expected) or 1, sum(actual) or 1
+    value = 0.0
+    for e, a in zip(expected, actual):
+        p, q = max(e / e_total, _EPS), max(a / a_total, _EPS)
+        value += (q - p) * math.log(q / p)
+    return value
+
+
+def ks_distance(expected, actual):
+    """Largest gap between the two binned CDFs."""
+    e_total, a_total = sum(expected) or 1, sum(actual) or 1
+    e_cum = a_cum = gap = 0.0
+    for e, a in zip(expected, actual):
+        e_cum += e / e_total
+        a_cum += a / a_total
+        gap = max(gap, abs(e_cum - a_cum))
+    return gap
+
+
+def export_readings(readings, path=LIVE_DATA_PATH):
+    """
+    Write live readings as a training CSV (atomically), labelled with the
+    rule train_model applies to unlabelled data, so a retrain sees the
+    distribution that drifted instead of the same files as last time.
+    """
+    columns = ["timestamp", "node_id", "soil_temp", "air_temp", "soil_moisture", "humidity", "light"]
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns + ["irrigation_needed"])
+        for r in readings:
+            writer.writerow([r.get(c, "") for c in columns] + [int(float(r["soil_moisture"]) < 30)])
+    os.replace(tmp, path)
+
+
+_retrain_process = None
+
+
+def retrain_in_background(readings=None):
+    """
+    Default drift action: run models/train_model.py in a child process, on
+    ``readings`` (recent live data) plus the existing data files. Returns the
+    running process instead of starting a second one.
+    """
+    global _retrain_process
+    if _retrain_process is not None and _retrain_process.poll() is None:
+        return _retrain_process
+    check_retrain()  # report how the previous run ended before starting another
+    models_dir = os.path.dirname(os.path.abspath(__file__))
+    root = os.path.dirname(models_dir)
+    if readings:
+        export_readings(readings, os.path.join(root, LIVE_DATA_PATH))
+    # train_model.py writes to paths relative to the repo root
+    _retrain_process = subprocess.Popen([sys.executable, os.path.join(models_dir, "train_model.py")], cwd=root)
+    return _retrain_process
+
+
+def check_retrain():
+    """
+    Poll the background retrain. Once it has exited, log the outcome (a
+    failed run leaves the current model in place) and return its exit code;
+    None while it is still running or if none was started.
+    """
+    global _retrain_process
+    if _retrain_process is None:
+        return None
+    code = _retrain_process.poll()
+    if code is None:
+        return None
+    _retrain_process = None
+    if code != 0:
+        logging.error(f"❌ Background retrain failed with exit code {code}; keeping the current model")
+    else:
+        logging.info("✅ Background retrain finished")
+    return code
+
+
+# =============== MONITOR ===============
+class DriftMonitor:
+    def __init__(self, reference, on_drift=None, half_life=HALF_LIFE, min_samples=MIN_SAMPLES,
+                 check_every=CHECK_EVERY, psi_threshold=PSI_THRESHOLD, ks_threshold=KS_THRESHOLD,
+                 positive_rate_threshold=POSITIVE_RATE_THRESHOLD, cooldown_s=COOLDOWN_S, clock=time.time,
+                 recent_size=RECENT_SIZE):
+        self.reference = reference
+        self.on_drift = on_drift
+        self.decay = 0.5 ** (1.0 / half_life)
+        self.min_samples = min_samples
+        self.check_every = check_every
+        self.psi_threshold = psi_threshold
+        self.ks_threshold = ks_threshold
+        self.positive_rate_threshold = positive_rate_threshold
+        self.cooldown_s = cooldown_s
+        self.clock = clock
+        self.edges = [reference["features"][f]["edges"] for f in FEATURES]
+        self.recent = deque(maxlen=recent_size)
+        self.last_trigger = None
+        self.reset()
+
+    @classmethod
+    def from_file(cls, path=REFERENCE_PATH, **kwargs):
+        reference = load_reference_profile(path)
+        return cls(reference, **kwargs) if reference else None
+
+    def carry_over(self, previous):
+        """Keep the cooldown and recent readings of the monitor this one replaces (model reload)."""
+        if previous is not None:
+            self.last_trigger = previous.last_trigger
+            self.recent.extend(previous.recent)
+        return self
+
+    def reset(self):
+        self.counts = [[0.0] * (len(e) + 1) for e in self.edges]
+        self.positive_weight = 0.0
+        self.total_weight = 0.0
+        self._weight = 1.0
+        self.samples = 0
+        self.last_report = None
+
+    def update(self, reading, predicted_positive):
+        """
+        Add one reading and whether the model predicted irrigation.
+
+        Instead of decaying every bin, each new sample gets a weight that
+        grows by 1/decay; all counts are rescaled only when weights get huge.
+        """
+        features = feature_vector(reading)
+        self.recent.append(reading)
+        w = self._weight
+        for i, value in enumerate(features):
+            self.counts[i][bisect.bisect_right(self.edges[i], value)] += w
+        if predicted_positive:
+            self.positive_weight += w
+        self.total_weight += w
+        self.samples += 1
+        self._weight = w / self.decay
+        if self._weight > _RESCALE_AT:
+            self._rescale()
+
+        if self.samples >= self.min_samples and self.samples % self.check_every == 0:
+            return self.check()
+        return None
+
+    def _rescale(self):
+        scale = 1.0 / self._weight
+        self.counts = [[c * scale for c in row] for row in self.counts]
+        self.positive_weight *= scale
+        self.total_weight *= scale
+        self._weight = 1.0
+
+    def report(self):
+        """Per-feature PSI/KS and positive-rate shift against the reference."""
+        features = {}
+        for name, live in zip(FEATURES, self.counts):
+            ref = self.reference["features"][name]["counts"]
+            features[name] = {"psi": round(psi(ref, live), 4), "ks": round(ks_distance(ref, live), 4)}
+        live_rate = self.positive_weight / self.total_weight if self.total_weight else 0.0
+        rate_shift = abs(live_rate - self.reference["positive_rate"])
+        drifted = [n for n, m in features.items()
+                   if m["psi"] > self.psi_threshold or m["ks"] > self.ks_threshold]
+        return {
+            "samples": self.samples,
+            "features": features,
+            "positive_rate": round(live_rate, 4),
+            "reference_positive_rate": round(self.reference["positive_rate"], 4),
+            "positive_rate_shift": round(rate_shift, 4),
+            "drifted_features": drifted,
+            "drift": bool(drifted) or rate_shift > self.positive_rate_threshold,
+        }
+
+    def check(self):
+        """Evaluate drift; call ``on_drift(report)`` if it crossed a threshold and cooldown allows."""
+        report = self.last_report = self.report()
+        if not report["drift"]:
+            return report
+        now = self.clock()
+        if self.last_trigger is not None and now - self.last_trigger < self.cooldown_s:
+            return report
+        self.last_trigger = now
+        report["triggered"] = True
+        if self.on_drift is not None:
+            self.on_drift(report)
+        return report
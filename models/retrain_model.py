@@ -1,17 +1,26 @@
 # Retrain using collected_data.csv which contains optional labels in last column
 import pandas as pd
 import os
+import sys
 from shutil import copyfile
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.dedup import drop_duplicate_readings
+
 COLLECTED = "data/collected_data.csv"
 TRAINING = "data/training_data.csv"
 BACKUP = "data/training_backup.csv"
+# collected_data.csv has no header row
+COLLECTED_COLUMNS = ['timestamp','soil_moisture','soil_temp','air_temp','humidity','light','label']
+FEATURES = ['soil_moisture','soil_temp','air_temp','humidity','light']
 
 if not os.path.exists(COLLECTED):
     print("No collected data to retrain.")
     raise SystemExit(1)
 
-df = pd.read_csv(COLLECTED)
+df = pd.read_csv(COLLECTED, header=None, names=COLLECTED_COLUMNS)
+# The same reading often appears twice (unlabeled, then labeled): keep one row with the label
+df = drop_duplicate_readings(df, label_column='label')
 # Keep only rows where label present (0 or 1)
 df_labeled = df[df['label'].notna() & (df['label'] != '')]
 if df_labeled.empty:
@@ -19,15 +28,22 @@ if df_labeled.empty:
     raise SystemExit(1)
 
 # Map and append to training CSV
-cols = ['soil_moisture','soil_temp','air_temp','humidity','light','label']
-df_labeled = df_labeled[cols]
+df_labeled = df_labeled[FEATURES + ['label']]
 df_labeled = df_labeled.rename(columns={'label':'irrigation_needed'})
+df_labeled['irrigation_needed'] = df_labeled['irrigation_needed'].astype(float).astype(int)
 
 # Append to training CSV
-if os.path.exists(TRAINING):
+if os.path.exists(TRAINING) and os.path.getsize(TRAINING) > 0:
     copyfile(TRAINING, BACKUP)
     existing = pd.read_csv(TRAINING)
-    combined = pd.concat([existing, df_labeled[['soil_moisture','soil_temp','air_temp','humidity','light','irrigation_needed']]], ignore_index=True)
+    # Readings appended by an earlier run are already in there: only add new ones
+    known = existing[FEATURES].round(2).drop_duplicates()
+    seen = df_labeled[FEATURES].round(2).merge(known, how='left', indicator=True)['_merge'] == 'both'
+    df_labeled = df_labeled[~seen.to_numpy()]
+    if df_labeled.empty:
+        print("No new labeled rows since the last retrain.")
+        raise SystemExit(0)
+    combined = pd.concat([existing, df_labeled], ignore_index=True)
 else:
     combined = df_labeled
 
@@ -0,0 +1,161 @@
+"""
+Multi-zone valve scheduler with shared pump capacity and a daily water budget.
+
+Each zone's latest decision and irrigation probability go into a heap-based
+priority queue. ``update`` is O(log n): a changed zone gets a fresh heap entry
+and its old one is dropped lazily when popped. ``plan`` walks the queue in
+priority order and assigns each zone to the earliest free pump slot until the
+day's remaining budget runs out.
+"""
+import heapq
+import time
+from datetime import datetime
+
+DEFAULT_PUMP_CAPACITY = 4        # valves that can be open at once
+DEFAULT_DAILY_BUDGET_L = 20000   # litres per day across all zones
+DEFAULT_FLOW_LPM = 20            # litres per minute through one open valve
+DEFAULT_MINUTES = 15             # run time when soil moisture is unknown
+TARGET_MOISTURE = 60.0           # % to refill to
+MINUTES_PER_PERCENT = 0.5        # run time per % of moisture deficit
+MIN_MINUTES, MAX_MINUTES = 5, 60
+
+
+class IrrigationScheduler:
+    def __init__(self, pump_capacity=DEFAULT_PUMP_CAPACITY, daily_budget_l=DEFAULT_DAILY_BUDGET_L,
+                 flow_lpm=DEFAULT_FLOW_LPM, clock=time.time):
+        self.pump_capacity = pump_capacity
+        self.daily_budget_l = daily_budget_l
+        self.flow_lpm = flow_lpm
+        self.clock = clock
+        self._heap = []       # (-priority, seq, zone_id)
+        self._pending = {}    # zone_id -> (seq, priority, minutes)
+        self._running = {}    # zone_id -> end time
+        self._seq = 0
+        self._day = None
+        self.used_today_l = 0.0
+
+    # =============== INPUT ===============
+    def run_minutes(self, soil_moisture):
+        if soil_moisture is None:
+            return DEFAULT_MINUTES
+        minutes = (TARGET_MOISTURE - soil_moisture) * MINUTES_PER_PERCENT
+        return min(MAX_MINUTES, max(MIN_MINUTES, minutes))
+
+    def update(self, zone_id, decision, probability=None, soil_moisture=None):
+        """
+        Record the latest decision for a zone.
+
+        ``decision`` is 1/"IRRIGATION" or 0/"NO_IRRIGATION"; ``probability``
+        (e.g. from ``model.predict_proba``) ranks zones that need water, with
+        drier soil breaking ties.
+        """
+        needs_water = decision in (1, True, "IRRIGATION")
+        if not needs_water or zone_id in self._running:
+            self._pending.pop(zone_id, None)
+            return
+        priority = 1.0 if probability is None else float(probability)
+        if soil_moisture is not None:
+            priority += (100.0 - soil_moisture) * 1e-4
+        self._seq += 1
+        self._pending[zone_id] = (self._seq, priority, self.run_minutes(soil_moisture))
+        heapq.heappush(self._heap, (-priority, self._seq, zone_id))
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._compact()
+
+    def update_many(self, zone_ids, decisions, probabilities=None, soil_moistures=None):
+        n = len(zone_ids)
+        probabilities = probabilities if probabilities is not None else [None] * n
+        soil_moistures = soil_moistures if soil_moistures is not None else [None] * n
+        for zone_id, decision, probability, moisture in zip(zone_ids, decisions, probabilities, soil_moistures):
+            self.update(zone_id, decision, probability, moisture)
+
+    def _compact(self):
+        self._heap = [(-p, seq, z) for z, (seq, p, _) in self._pending.items()]
+        heapq.heapify(self._heap)
+
+    # =============== VALVES ===============
+    def _roll_day(self, now):
+        day = datetime.fromtimestamp(now).date()
+        if day != self._day:
+            self._day = day
+            self.used_today_l = 0.0
+
+    def start(self, zone_id, minutes=None, now=None):
+        """Mark a zone's valve as open and charge its water to today's budget."""
+        now = self.clock() if now is None else now
+        self._roll_day(now)
+        entry = self._pending.pop(zone_id, None)
+        minutes = minutes or (entry[2] if entry else DEFAULT_MINUTES)
+        self._running[zone_id] = now + minutes * 60
+        self.used_today_l += minutes * self.flow_lpm
+
+    def finish(self, zone_id):
+        self._running.pop(zone_id, None)
+
+    def reap(self, now=None):
+        """Close valves whose run time has elapsed; returns their zone ids."""
+        now = self.clock() if now is None else now
+        done = [z for z, end in self._running.items() if end <= now]
+        for zone_id in done:
+            del self._running[zone_id]
+        return done
+
+    # =============== PLANNING ===============
+    def plan(self, now=None, limit=None):
+        """
+        Return the valve schedule as a list of dicts (zone_id, start, end, minutes, litres).
+
+        Zones are taken in priority order and placed on the earliest free pump
+        slot; a zone that no longer fits in the remaining budget is skipped so
+        smaller, lower-priority zones can still run.
+        """
+        now = self.clock() if now is None else now
+        self._roll_day(now)
+        remaining = self.daily_budget_l - self.used_today_l
+        slots = sorted(max(now, end) for end in self._running.values())[:self.pump_capacity]
+        slots += [now] * (self.pump_capacity - len(slots))
+        heapq.heapify(slots)
+
+        schedule = []
+        heap = list(self._heap)
+        while heap and remaining > 0 and (limit is None or len(schedule) < limit):
+            neg_priority, seq, zone_id = heapq.heappop(heap)
+            entry = self._pending.get(zone_id)
+            if entry is None or entry[0] != seq:
+                continue  # stale entry
+            minutes = entry[2]
+            litres = minutes * self.flow_lpm
+            if litres > remaining:
+                if remaining < MIN_MINUTES * self.flow_lpm:
+                    break  # nothing else can fit
+                continue
+            start = heapq.heappop(slots)
+            end = start + minutes * 60
+            heapq.heappush(slots, end)
+            remaining -= litres
+            schedule.append({
+                "zone_id": zone_id,
+                "start": start,
+                "end": end,
+                "minutes": round(minutes, 2),
+                "litres": round(litres, 2),
+                "priority": round(-neg_priority, 4),
+            })
+        return schedule
+
+    def due(self, now=None):
+        """Zones from the current plan that should open now (free pump slots only)."""
+        now = self.clock() if now is None else now
+        free = self.pump_capacity - len(self._running)
+        if free <= 0:
+            return []
+        return [s for s in self.plan(now, limit=free) if s["start"] <= now]
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "running": len(self._running),
+            "heap_size": len(self._heap),
+            "used_today_l": round(self.used_today_l, 2),
+            "remaining_budget_l": round(self.daily_budget_l - self.used_today_l, 2),
+        }
@@ -7,6 +7,11 @@ from xgboost import XGBClassifier
 import joblib
 from datetime import datetime
 import numpy as np
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.dedup import drop_duplicate_readings
+from models.drift_monitor import save_reference_profile
 
 # 🔄 Auto-detect data folder
 def find_data_folder():
@@ -24,6 +29,7 @@ def find_data_folder():
 DATA_PATH = find_data_folder()
 MODEL_PATH = "models/irrigation_xgb_model.pkl"
 REPORT_PATH = "models/xgb_training_report.txt"
+REFERENCE_PATH = "models/reference_profile.json"
 
 
 def load_all_data():
@@ -45,6 +51,10 @@ def load_all_data():
             print(f"⚠️ Skipped {f}: {e}")
 
     merged = pd.concat(dataframes, ignore_index=True)
+    before = len(merged)
+    merged = drop_duplicate_readings(merged)
+    if len(merged) < before:
+        print(f"🧹 Dropped {before - len(merged)} duplicate readings")
     print(f"✅ Total merged data shape: {merged.shape}")
     return merged
 
@@ -63,6 +73,10 @@ def preprocess_data(df):
         "soilmoisture": "soil_moisture"
     }
     df.rename(columns=rename_map, inplace=True)
+    # Files that call it "light" and "light_intensity" both map to "light": keep one, filled from either
+    for name in df.columns[df.columns.duplicated()].unique():
+        merged = df.loc[:, name].bfill(axis=1).iloc[:, 0]
+        df = df.drop(columns=name).assign(**{name: merged})
 
     if "light" not in df.columns:
         print("⚠️ 'light' column missing — generating mock light data (temporary).")
@@ -142,7 +156,14 @@ def train_xgboost_model(df):
 
     # ensure models directory exists before saving the file
     os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
+
+    # Feature/prediction histograms the drift monitor compares live traffic against.
+    # Written before the model: main.py reloads both when the model file changes.
+    save_reference_profile(X_train[features], model.predict(X_train), REFERENCE_PATH)
+    print(f"📐 Reference profile saved: {REFERENCE_PATH}")
+
+    joblib.dump(model, MODEL_PATH + ".tmp")
+    os.replace(MODEL_PATH + ".tmp", MODEL_PATH)  # never expose a half-written model
     print(f"💾 Model saved: {MODEL_PATH}")
 
     with open(REPORT_PATH, "w", encoding="utf-8") as f:
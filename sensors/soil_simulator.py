@@ -0,0 +1,139 @@
+"""
+Closed-loop soil water balance for running the controller in simulated time.
+
+Unlike ``generate_mock_data.SyntheticFieldGenerator`` (which refills the soil
+on its own), moisture here only goes up when the controller opens a valve or
+it rains, so the irrigation policy under test decides how dry the field gets.
+All nodes are advanced together with NumPy; ``read()`` integrates up to the
+clock's current time and returns one reading per node.
+"""
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.clock import SYSTEM_CLOCK
+
+FLOW_LPM = 20                # litres per minute through one open valve (as in models/scheduler.py)
+LITRES_PER_PERCENT = 40.0    # water that raises a zone's soil moisture by 1 %
+MOISTURE_THRESHOLD = 30.0    # below this the crop is counted as water-stressed
+RAIN_PER_HOUR = 0.01         # chance of a rain event starting in any hour
+DRAINAGE_TAU_H = 2.0         # time constant for water above field capacity to drain
+MAX_STEP_S = 900             # integrate in steps of at most 15 minutes
+
+
+class SoilWaterBalance:
+    def __init__(self, num_nodes=1, clock=SYSTEM_CLOCK, seed=None, flow_lpm=FLOW_LPM,
+                 litres_per_percent=LITRES_PER_PERCENT, threshold=MOISTURE_THRESHOLD):
+        self.num_nodes = num_nodes
+        self.clock = clock
+        self.flow_lpm = flow_lpm
+        self.litres_per_percent = litres_per_percent
+        self.threshold = threshold
+        self.rng = np.random.default_rng(seed)
+
+        n = num_nodes
+        rng = self.rng
+        # Per-node climate and soil parameters (same ranges as SyntheticFieldGenerator)
+        self.air_mean = rng.uniform(24, 32, n)
+        self.air_amp = rng.uniform(4, 8, n)
+        self.soil_offset = rng.uniform(-4, -1, n)
+        self.light_peak = rng.uniform(700, 1200, n)
+        self.field_capacity = rng.uniform(70, 85, n)
+        self.dry_rate = rng.uniform(0.8, 1.6, n)  # % moisture lost per hour at 25 °C
+        self.moisture = rng.uniform(35, 70, n)
+        self.valves = np.zeros(n, dtype=bool)
+
+        self.last = clock()
+        # Running totals for the simulation report
+        self.water_used_l = np.zeros(n)
+        self.irrigation_s = np.zeros(n)
+        self.below_threshold_s = np.zeros(n)
+        self.rain_events = 0
+        self.elapsed_s = 0.0
+
+    # =============== WEATHER ===============
+    def _weather(self, now):
+        """Air/soil temperature, light and humidity of every node at epoch ``now``."""
+        hod = (now % 86400) / 3600.0
+        air_temp = self.air_mean + self.air_amp * np.sin(2 * np.pi * (hod - 9) / 24)
+        soil_temp = self.air_mean + self.soil_offset + 0.4 * self.air_amp * np.sin(2 * np.pi * (hod - 12) / 24)
+        light = self.light_peak * max(0.0, np.sin(np.pi * (hod - 6) / 12))
+        humidity = np.clip(90 - 2.2 * (air_temp - self.air_mean + self.air_amp), 25, 100)
+        return soil_temp, air_temp, light, humidity
+
+    # =============== WATER BALANCE ===============
+    def set_valve(self, node_id, on):
+        self.valves[int(node_id)] = bool(on)
+
+    def advance(self, seconds):
+        """Integrate ET, irrigation, rain and drainage over ``seconds``."""
+        while seconds > 0:
+            dt = min(seconds, MAX_STEP_S)
+            self._step(self.last, dt)
+            self.last += dt
+            seconds -= dt
+
+    def advance_to(self, now):
+        if now > self.last:
+            self.advance(now - self.last)
+
+    def _step(self, now, dt):
+        hours = dt / 3600.0
+        _, air_temp, light, _ = self._weather(now + dt / 2)
+        below = self.moisture < self.threshold
+
+        # Evapotranspiration slows down as the soil dries out
+        et = self.dry_rate * (1 + 0.06 * (air_temp - 25) + 0.4 * light / 1000.0)
+        et = np.clip(et, 0.05, None) * np.clip(self.moisture / 40.0, 0.2, 1.0) * hours
+        litres = self.valves * self.flow_lpm * dt / 60.0
+        rain = np.zeros(self.num_nodes)
+        starts = self.rng.random() < RAIN_PER_HOUR * hours  # one front covers the whole field
+        if starts:
+            self.rain_events += 1
+            rain = self.rng.uniform(5, 25) * self.rng.uniform(0.7, 1.0, self.num_nodes)
+
+        moisture = self.moisture - et + litres / self.litres_per_percent + rain
+        excess = np.clip(moisture - self.field_capacity, 0, None)
+        moisture -= excess * (1 - np.exp(-hours / DRAINAGE_TAU_H))
+        self.moisture = np.clip(moisture, 0, 100)
+
+        self.water_used_l += litres
+        self.irrigation_s += self.valves * dt
+        self.below_threshold_s += (below.astype(float) + (self.moisture < self.threshold)) * dt / 2
+        self.elapsed_s += dt
+
+    # =============== SENSORS ===============
+    def read(self):
+        """Advance to the clock's current time and return one reading dict per node."""
+        now = self.clock()
+        self.advance_to(now)
+        soil_temp, air_temp, light, humidity = self._weather(now)
+        noise = self.rng.normal(0, [[0.15], [0.4], [0.3], [2.0], [15.0]], (5, self.num_nodes))
+        columns = np.round([
+            soil_temp + noise[0], air_temp + noise[1], np.clip(self.moisture + noise[2], 0, 100),
+            np.clip(humidity + noise[3], 25, 100), np.clip(light + noise[4], 0, None),
+        ], 2).T.tolist()
+        timestamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
+        return [
+            {"timestamp": timestamp, "node_id": node, "soil_temp": st, "air_temp": at,
+             "soil_moisture": sm, "humidity": hu, "light": li}
+            for node, (st, at, sm, hu, li) in enumerate(columns)
+        ]
+
+    def summary(self):
+        hours = self.elapsed_s / 3600.0
+        return {
+            "nodes": self.num_nodes,
+            "simulated_days": round(hours / 24, 2),
+            "water_used_l": round(float(self.water_used_l.sum()), 1),
+            "water_per_node_day_l": round(float(self.water_used_l.sum()) / max(self.num_nodes * hours / 24, 1e-9), 1),
+            "irrigation_hours": round(float(self.irrigation_s.sum()) / 3600.0, 1),
+            "hours_below_threshold": round(float(self.below_threshold_s.sum()) / 3600.0, 1),
+            "pct_time_below_threshold": round(100 * float(self.below_threshold_s.sum())
+                                              / max(self.elapsed_s * self.num_nodes, 1e-9), 2),
+            "rain_events": self.rain_events,
+            "final_mean_moisture": round(float(self.moisture.mean()), 2),
+        }
@@ -0,0 +1,134 @@
+"""
+Faster-than-real-time simulation of the controller.
+
+Runs ``main.main_loop`` on a ``VirtualClock`` against a closed-loop soil water
+balance (``sensors/soil_simulator.py``), with a local sink standing in for
+Supabase that opens and closes the simulated valves. Months of multi-node
+operation replay in seconds:
+
+    python simulate.py --days 90 --nodes 10 --interval 600
+    python simulate.py --days 90 --nodes 10 --policy rule --json
+
+Reports water used, time spent below the moisture threshold and decision
+throughput. Nothing is uploaded and the live shared-memory ring, rollup
+database and drift-triggered retraining are left alone.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+# main.py opens its rollup DB on import; a simulation must not create or touch the live one
+os.environ.setdefault("IRRIGATION_ROLLUP_DB", ":memory:")
+import main
+from sensors.soil_simulator import SoilWaterBalance, MOISTURE_THRESHOLD
+from utils.clock import VirtualClock
+from utils.rollups import LEVELS, RollupEngine
+
+DEFAULT_START = datetime(2025, 6, 1, tzinfo=timezone.utc)
+REFILL_POINT = 40.0  # moisture the "rule" policy irrigates below
+
+
+class LocalUploadSink:
+    """
+    Drop-in for ``main.upload_to_supabase``: applies each decision to the
+    simulated valve of its node and optionally keeps or writes the records.
+    """
+
+    def __init__(self, field, path=None, keep=False):
+        self.field = field
+        self.keep = keep
+        self.records = []
+        self.uploaded = 0
+        self._file = self._writer = None
+        if path:
+            self._file = open(path, "w", newline="")
+
+    def __call__(self, record):
+        self.field.set_valve(record["node_id"], record["decision"] == "IRRIGATION")
+        self.uploaded += 1
+        if self.keep:
+            self.records.append(record)
+        if self._file is not None:
+            if self._writer is None:
+                self._writer = csv.DictWriter(self._file, fieldnames=list(record))
+                self._writer.writeheader()
+            self._writer.writerow(record)
+        return True
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def threshold_policy(readings):
+    """Baseline to compare the model against: irrigate whenever the soil is below REFILL_POINT."""
+    return ["IRRIGATION" if r["soil_moisture"] < REFILL_POINT else "NO_IRRIGATION" for r in readings]
+
+
+def simulate(days=30, nodes=10, interval=600, seed=42, policy="model", start=DEFAULT_START, out=None):
+    """Run the controller for ``days`` of simulated time and return the report dict."""
+    if policy == "model" and main.model is None:
+        raise RuntimeError(f"No model at {main.MODEL_PATH}; train one or use policy='rule'")
+    decide_fn = threshold_policy if policy == "rule" else main.decide_irrigation_many
+
+    clock = VirtualClock(start)
+    field = SoilWaterBalance(nodes, clock=clock, seed=seed)
+    sink = LocalUploadSink(field, path=out)
+    # Readings are minutes apart, so a minute level would only add a write per reading
+    engine = RollupEngine(":memory:", levels={k: v for k, v in LEVELS.items() if v >= interval})
+    ticks = int(days * 86400 // interval)
+
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.WARNING)  # one INFO line per decision would dominate the run time
+    started = time.perf_counter()
+    try:
+        decisions = main.main_loop(clock=clock, read_fn=field.read, sink=sink, decide_fn=decide_fn,
+                                   interval=interval, max_ticks=ticks, rollup_engine=engine, simulation=True)
+    finally:
+        root.setLevel(level)
+        sink.close()
+    wall = time.perf_counter() - started
+    field.advance_to(clock())  # account for the last interval's water
+
+    report = {"policy": policy, "interval_s": interval, **field.summary()}
+    report.update({
+        "threshold": MOISTURE_THRESHOLD,
+        "decisions": decisions,
+        "wall_s": round(wall, 3),
+        "decisions_per_s": round(decisions / wall, 1) if wall else None,
+        "speedup": round(days * 86400 / wall) if wall else None,
+        "rollup_irrigation_hours": round(engine.totals(start, clock())["irrigation_on_s"] / 3600.0, 1),
+    })
+    if policy == "model":
+        report["decision_cache"] = main.decision_cache.stats()
+    engine.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay months of controller operation in simulated time.")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--nodes", type=int, default=10)
+    parser.add_argument("--interval", type=int, default=600, help="simulated seconds between readings")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--policy", choices=["model", "rule"], default="model")
+    parser.add_argument("--out", default=None, help="also write every record to this CSV")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    result = simulate(args.days, args.nodes, args.interval, args.seed, args.policy, out=args.out)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"🌱 {result['simulated_days']} days x {result['nodes']} nodes ({args.policy} policy)")
+        print(f"💧 Water used: {result['water_used_l']:,} L ({result['water_per_node_day_l']} L/node/day)")
+        print(f"🏜️ Below {MOISTURE_THRESHOLD:g}% moisture: {result['hours_below_threshold']} node-hours "
+              f"({result['pct_time_below_threshold']}% of the time)")
+        print(f"🌧️ Rain events: {result['rain_events']}")
+        print(f"⚡ {result['decisions']:,} decisions in {result['wall_s']} s "
+              f"({result['decisions_per_s']:,} decisions/s, {result['speedup']:,}x real time)")
@@ -6,7 +6,12 @@ import datetime
 import joblib
 import numpy as np
 import os
+import sys
 import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.rollups import RollupEngine
+from utils import shared_state
 # ---------------------------
 # Supabase Configuration
 # ---------------------------
@@ -136,6 +141,48 @@ else:
     )
     st.plotly_chart(fig3, use_container_width=True)
 
+# ---------------------------
+# Live Controller State (shared memory)
+# ---------------------------
+@st.cache_resource
+def get_live_feed():
+    # Cache the feed, not the reader: it re-attaches once the controller (re)starts
+    return shared_state.LiveFeed()
+
+live = get_live_feed().reader()
+if live is not None:
+    st.subheader("🔗 Live Controller State")
+    live_df = pd.DataFrame(live.latest_per_node())
+    live_df["timestamp"] = pd.to_datetime(live_df["timestamp"], unit="s")
+    st.dataframe(live_df, use_container_width=True)
+
+# ---------------------------
+# Rollups (local gateway history)
+# ---------------------------
+ROLLUP_DB = os.environ.get("IRRIGATION_ROLLUP_DB", os.path.join(os.path.dirname(__file__), "..", "data", "rollups.db"))
+
+@st.cache_resource
+def get_rollups():
+    return RollupEngine(os.path.abspath(ROLLUP_DB))
+
+if os.path.exists(ROLLUP_DB):
+    st.subheader("💧 Water Savings (last 30 days)")
+    now = time.time()
+    rollups = get_rollups()
+    daily = pd.DataFrame(rollups.query(now - 30 * 86400, now, level="day"))
+    if daily.empty:
+        st.info("No rollups recorded yet.")
+    else:
+        totals = rollups.totals(now - 30 * 86400, now)
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Water Saved (L)", f"{totals['water_saved_l']:.1f}")
+        c2.metric("Irrigation Time (h)", f"{totals['irrigation_on_s'] / 3600:.1f}")
+        c3.metric("Readings", f"{totals['readings']}")
+        fig4 = px.bar(daily, x="start", y="water_saved_l", color="node",
+                      labels={"start": "Day", "water_saved_l": "Water Saved (L)"},
+                      title="Estimated Water Saved per Day")
+        st.plotly_chart(fig4, use_container_width=True)
+
 # ---------------------------
 # Sidebar Controls
 # ---------------------------
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.decision_cache import DecisionCache
+
+
+def _threshold_decision(reading):
+    return "IRRIGATION" if reading["soil_moisture"] < 30 else "NO_IRRIGATION"
+
+
+def _drying_readings(steps=40, step=0.5):
+    # Soil moisture falls below the delta threshold (1 %) on every step
+    return [
+        {"soil_temp": 25.0, "air_temp": 30.0, "soil_moisture": 40.0 - i * step, "humidity": 60.0, "light": 500.0}
+        for i in range(steps)
+    ]
+
+
+def test_decide_many_follows_slow_trend():
+    cache = DecisionCache(_threshold_decision)
+    calls = []
+
+    def batch(readings):
+        calls.append(len(readings))
+        return [_threshold_decision(r) for r in readings]
+
+    decisions = [cache.decide_many([r], batch, node_ids=["n1"])[0] for r in _drying_readings()]
+    assert decisions[0] == "NO_IRRIGATION"
+    assert decisions[-1] == "IRRIGATION"
+    assert len(calls) > 1
+
+
+def test_decide_many_matches_decide():
+    single, many = DecisionCache(_threshold_decision), DecisionCache(_threshold_decision)
+    batch = lambda readings: [_threshold_decision(r) for r in readings]
+    for reading in _drying_readings():
+        assert single.decide(reading, node_id="n1") == many.decide_many([reading], batch, node_ids=["n1"])[0]
@@ -0,0 +1,57 @@
+import csv
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.dedup import LABEL_MERGED, DedupIndex, compact_csv, drop_duplicate_readings, journal_label
+
+
+def test_drop_duplicate_readings_with_nan_key_columns():
+    # light is missing from one of the merged files, so it is NaN here
+    df = pd.DataFrame({
+        "timestamp": ["2025-01-01 00:00:00", "2025-01-01 00:00:00", "2025-01-01 00:00:10"],
+        "soil_moisture": [40.0, 40.0, 39.5],
+        "light": [np.nan, np.nan, 500.0],
+        "label": [None, "1", None],
+    })
+    out = drop_duplicate_readings(df, label_column="label")
+    assert len(out) == 2
+    assert out.loc[0, "label"] == "1"  # label merged from the later copy
+
+
+def test_drop_duplicate_readings_keeps_rows_without_timestamp():
+    df = pd.DataFrame({
+        "timestamp": ["2025-01-01 00:00:00", np.nan, np.nan],
+        "soil_moisture": [40.0, 30.0, 30.0],
+        "light": [500.0, 500.0, 500.0],
+    })
+    assert len(drop_duplicate_readings(df)) == 3
+
+
+def test_drop_duplicate_readings_without_timestamp_column_is_noop():
+    df = pd.DataFrame({"soil_moisture": [30.0, 30.0], "light": [500.0, 500.0]})
+    assert len(drop_duplicate_readings(df)) == 2
+
+
+def test_late_label_is_journaled_and_compacted_into_the_row(tmp_path):
+    path = str(tmp_path / "offline_backup.csv")
+    reading = {"timestamp": "2025-01-01 00:00:00", "node_id": 3, "soil_temp": 21.0, "air_temp": 26.0,
+               "soil_moisture": 28.5, "humidity": 50.0, "light": 400.0}
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(reading) + ["label"])
+        writer.writeheader()
+        writer.writerow(reading)
+    index = DedupIndex()
+    index.record(reading)
+
+    labelled = dict(reading, label="1")
+    assert index.classify(labelled) == LABEL_MERGED
+    journal_label(path, labelled)
+    assert compact_csv(path) == (1, 1)
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]["label"] == "1"
+    assert not os.path.exists(path + ".labels")
@@ -0,0 +1,36 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.rollups import RollupEngine
+
+START = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+def _reading(minute, moisture, decision="NO_IRRIGATION", node_id=0):
+    return {"timestamp": (START + timedelta(minutes=minute)).isoformat(), "node_id": node_id,
+            "soil_temp": 22.0, "air_temp": 27.0, "soil_moisture": moisture,
+            "humidity": 55.0, "light": 600.0, "decision": decision}
+
+
+def test_totals_count_readings_and_irrigation_time():
+    engine = RollupEngine(":memory:")
+    for minute in range(120):
+        engine.add(_reading(minute, 50.0, "IRRIGATION" if minute < 30 else "NO_IRRIGATION"))
+        engine.add(_reading(minute, 50.0, node_id=1))
+    totals = engine.totals(START, START + timedelta(hours=2))
+    assert totals["readings"] == 240
+    assert totals["irrigation_on_s"] == 30 * 60
+    assert engine.totals(START, START + timedelta(hours=2), node=1)["irrigation_on_s"] == 0
+    engine.close()
+
+
+def test_totals_keep_water_saved_below_rounding_step():
+    # 0.01 % per minute is 0.001 L per reading: rounded per reading this would add up to 0
+    engine = RollupEngine(":memory:")
+    for minute in range(1081):
+        engine.add(_reading(minute, 60.0 - 0.01 * minute))
+    totals = engine.totals(START, START + timedelta(days=1))
+    assert abs(totals["water_saved_l"] - 1.08) < 0.01
+    engine.close()
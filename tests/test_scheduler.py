@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.scheduler import IrrigationScheduler
+
+NOW = 1_750_000_000.0
+
+
+def test_plan_stays_within_daily_budget():
+    # 20 L/min: dry zones run 30 min (600 L), a nearly wet one the 5 min minimum (100 L)
+    scheduler = IrrigationScheduler(pump_capacity=4, daily_budget_l=1000, clock=lambda: NOW)
+    scheduler.update("a", "IRRIGATION", 0.9, soil_moisture=0)
+    scheduler.update("b", "IRRIGATION", 0.8, soil_moisture=0)
+    scheduler.update("c", "IRRIGATION", 0.1, soil_moisture=55)
+    plan = scheduler.plan()
+    assert [s["zone_id"] for s in plan] == ["a", "c"]  # b no longer fits, the smaller c still does
+    assert sum(s["litres"] for s in plan) <= 1000
+
+
+def test_plan_respects_pump_capacity():
+    scheduler = IrrigationScheduler(pump_capacity=2, clock=lambda: NOW)
+    for zone in range(5):
+        scheduler.update(zone, "IRRIGATION", 1 - zone / 10, soil_moisture=50)  # 5 min each
+    plan = scheduler.plan()
+    assert len(plan) == 5
+    for s in plan:
+        open_at_start = sum(1 for o in plan if o["start"] <= s["start"] < o["end"])
+        assert open_at_start <= 2
+    assert [s["start"] - NOW for s in plan] == [0, 0, 300, 300, 600]
+
+
+def test_running_valves_take_pump_slots():
+    scheduler = IrrigationScheduler(pump_capacity=1, clock=lambda: NOW)
+    scheduler.start("busy", minutes=10, now=NOW)
+    scheduler.update("next", "IRRIGATION", 1.0, soil_moisture=50)
+    assert scheduler.due() == []
+    assert scheduler.plan()[0]["start"] == NOW + 600
+    assert scheduler.reap(NOW + 600) == ["busy"]
+    assert [s["zone_id"] for s in scheduler.due(NOW + 600)] == ["next"]
+
+
+def test_superseded_and_cancelled_updates_are_skipped():
+    scheduler = IrrigationScheduler(clock=lambda: NOW)
+    scheduler.update("a", "IRRIGATION", 0.2)
+    scheduler.update("b", "IRRIGATION", 0.5)
+    scheduler.update("a", "IRRIGATION", 0.9)   # leaves a stale heap entry for "a"
+    scheduler.update("b", "NO_IRRIGATION")      # leaves a stale heap entry for "b"
+    plan = scheduler.plan()
+    assert [(s["zone_id"], s["priority"]) for s in plan] == [("a", 0.9)]
@@ -0,0 +1,72 @@
+import os
+import sys
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import shared_state
+from utils.shared_state import ShmRingReader, ShmRingWriter, to_dict
+
+
+def _reading(i, node):
+    return {"timestamp": 1_750_000_000 + i, "node_id": node, "soil_temp": 20.0, "air_temp": 25.0,
+            "soil_moisture": float(i), "humidity": 50.0, "light": 300.0}
+
+
+@pytest.fixture
+def ring():
+    name = f"irr_test_{uuid.uuid4().hex[:12]}"
+    writer = ShmRingWriter(name, capacity=8)
+    reader = ShmRingReader(name)
+    yield writer, reader
+    reader.close()
+    writer.close(unlink=False)
+    # The reader took the segment off this process's resource tracker; re-attach so unlink is balanced
+    leftover = shared_memory.SharedMemory(name=name)
+    leftover.close()
+    leftover.unlink()
+
+
+def test_latest_wraps_around_the_ring(ring):
+    writer, reader = ring
+    for i in range(11):
+        writer.publish(_reading(i, node=i % 3), "IRRIGATION" if i % 2 else "NO_IRRIGATION")
+    assert reader.written == 11
+    rows = [to_dict(r) for r in reader.latest(3)]
+    assert [r["soil_moisture"] for r in rows] == [8.0, 9.0, 10.0]
+    assert len(reader.latest(100)) == 8  # capped at capacity
+
+
+def test_latest_per_node_returns_newest_record_of_each_node(ring):
+    writer, reader = ring
+    for i in range(7):
+        writer.publish(_reading(i, node=i % 3), "IRRIGATION" if i == 5 else "NO_IRRIGATION")
+    latest = {r["node_id"]: r for r in reader.latest_per_node()}
+    assert {n: r["soil_moisture"] for n, r in latest.items()} == {0: 6.0, 1: 4.0, 2: 5.0}
+    assert latest[2]["decision"] == "IRRIGATION"
+
+
+def test_read_retries_when_the_writer_interleaves(ring):
+    writer, reader = ring
+    writer.publish(_reading(0, node=0))
+    seen = []
+
+    def count(records, written):
+        seen.append(written)
+        if len(seen) == 1:
+            writer.publish(_reading(1, node=0))  # lands between the reader's two seq checks
+        return written
+
+    assert reader.read(count) == 2
+    assert seen == [1, 2]
+
+
+def test_read_gives_up_while_a_write_is_in_progress(ring, monkeypatch):
+    writer, reader = ring
+    monkeypatch.setattr(shared_state.time, "sleep", lambda s: None)
+    writer.header[shared_state._SEQ] += 1  # odd: writer stalled mid-update
+    with pytest.raises(TimeoutError):
+        reader.read(lambda records, written: written, retries=3)
+    writer.header[shared_state._SEQ] += 1
@@ -1,16 +1,204 @@
-# Note: transformers + torch must be installed. This will download the model on first run.
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+# Note: transformers + torch must be installed. Without a local model_dir the model
+# is downloaded on first use.
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
 import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+# Sensor readings are bucketed this coarsely before they go into the prompt, so
+# answers for nearby states come from the cache.
+SENSOR_BUCKETS = {
+    "soil_moisture": 5.0,  # %
+    "soil_temp": 2.0,      # °C
+    "air_temp": 2.0,       # °C
+    "humidity": 5.0,       # %
+    "light": 100.0,        # Lux
+}
+
+
+def normalize_prompt(prompt):
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", prompt.strip().lower()).rstrip("?!. ")
+
+
+def bucket_sensor_state(sensor_state):
+    """Return a hashable, bucketed view of the readings that matter to the answer."""
+    if not sensor_state:
+        return ()
+    return tuple(
+        (key, round(float(sensor_state[key]) / step) * step)
+        for key, step in SENSOR_BUCKETS.items() if key in sensor_state
+    )
+
 
 class ChatAssistant:
-    def __init__(self, model_name="google/flan-t5-small", device=None):
+    """
+    Seq2seq chat model wrapper.
+
+    The model is loaded on the first ``ask`` (or an explicit ``load``). Answers
+    are cached in an LRU keyed on the normalized prompt plus bucketed sensor
+    state. With ``batch_window_ms`` > 0, concurrent ``ask`` calls are merged
+    into one ``generate`` by a background micro-batcher. ``ChatAssistant.cpu_serving()``
+    turns on everything suited to CPU-only gateways.
+    """
+
+    def __init__(self, model_name="google/flan-t5-small", device=None, model_dir=None,
+                 quantize=False, num_threads=None, cache_size=256,
+                 batch_window_ms=0, max_batch_size=8, model=None, tokenizer=None):
         self.model_name = model_name
+        self.model_dir = model_dir or os.environ.get("CHAT_MODEL_DIR")
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"Loading chat model {model_name} on {self.device} (may take time)...")
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name).to(self.device)
-
-    def ask(self, prompt, max_length=64):
-        toks = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-        out = self.model.generate(**toks, max_new_tokens=max_length)
-        return self.tokenizer.decode(out[0], skip_special_tokens=True)
+        self.quantize = quantize and self.device == "cpu"
+        self.num_threads = num_threads
+        self.cache_size = cache_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.model = model
+        self.tokenizer = tokenizer
+        self._load_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.generate_calls = 0
+        self._queue = None
+        if self.model is not None:
+            self._prepare_model()
+
+    @classmethod
+    def cpu_serving(cls, model_dir=None, **overrides):
+        """Lazy local load, int8 dynamic quantization, all cores and micro-batching."""
+        options = dict(device="cpu", model_dir=model_dir, quantize=True,
+                       num_threads=os.cpu_count(), batch_window_ms=20)
+        options.update(overrides)
+        return cls(**options)
+
+    # =============== LOADING ===============
+    def load(self):
+        """Load (and optionally quantize) the model; safe to call more than once."""
+        if self.model is not None and self.tokenizer is not None:
+            return self
+        with self._load_lock:
+            if self.model is None or self.tokenizer is None:
+                source = self.model_dir or self.model_name
+                local_only = self.model_dir is not None
+                print(f"Loading chat model {source} on {self.device} (may take time)...")
+                if self.tokenizer is None:
+                    self.tokenizer = AutoTokenizer.from_pretrained(source, local_files_only=local_only)
+                if self.model is None:
+                    self.model = AutoModelForSeq2SeqLM.from_pretrained(source, local_files_only=local_only)
+                    self._prepare_model()
+        return self
+
+    def _prepare_model(self):
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        self.model.eval()
+        if self.quantize:
+            self.model = torch.ao.quantization.quantize_dynamic(
+                self.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        self.model.to(self.device)
+
+    # =============== CACHE ===============
+    def _cache_get(self, key):
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return self._cache[key]
+            self.cache_misses += 1
+            return None
+
+    def _cache_put(self, key, answer):
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[key] = answer
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self):
+        with self._cache_lock:
+            return {
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_size": len(self._cache),
+                "generate_calls": self.generate_calls,
+            }
+
+    # =============== INFERENCE ===============
+    def _build_prompt(self, prompt, bucket):
+        if not bucket:
+            return prompt
+        context = ", ".join(f"{k.replace('_', ' ')} {v:g}" for k, v in bucket)
+        return f"Sensor readings: {context}. {prompt}"
+
+    def _generate(self, prompts, max_length):
+        """One ``generate`` call for a list of prompts."""
+        self.load()
+        toks = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.device)
+        with torch.inference_mode():
+            out = self.model.generate(**toks, max_new_tokens=max_length)
+        self.generate_calls += 1
+        return self.tokenizer.batch_decode(out, skip_special_tokens=True)
+
+    def ask(self, prompt, max_length=64, sensor_state=None):
+        bucket = bucket_sensor_state(sensor_state)
+        key = (normalize_prompt(prompt), bucket, max_length)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        full_prompt = self._build_prompt(prompt, bucket)
+        if self.batch_window > 0:
+            answer = self._submit(full_prompt, max_length).result()
+        else:
+            answer = self._generate([full_prompt], max_length)[0]
+        self._cache_put(key, answer)
+        return answer
+
+    # =============== MICRO-BATCHING ===============
+    def _submit(self, prompt, max_length):
+        if self._queue is None:
+            with self._load_lock:
+                if self._queue is None:
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._batch_worker, name="chat-batcher", daemon=True).start()
+        future = Future()
+        self._queue.put((prompt, max_length, future))
+        return future
+
+    def _batch_worker(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Requests with different token budgets get separate generate calls
+            groups = {}
+            for prompt, max_length, future in batch:
+                groups.setdefault(max_length, []).append((prompt, future))
+            for max_length, items in groups.items():
+                unique = list(dict.fromkeys(p for p, _ in items))
+                try:
+                    answers = dict(zip(unique, self._generate(unique, max_length)))
+                    for prompt, future in items:
+                        future.set_result(answers[prompt])
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
@@ -0,0 +1,42 @@
+"""
+Injectable clocks so loops written against wall time can run in simulated time.
+
+A clock is called like ``time.time`` (so it can be passed anywhere the repo
+takes ``clock=time.time``, e.g. ``DriftMonitor`` or ``IrrigationScheduler``)
+and has a ``sleep(seconds)`` method. ``VirtualClock.sleep`` jumps the time
+forward without blocking, so a loop that sleeps 10 s per tick replays a
+month in however long its actual work takes.
+"""
+import time
+from datetime import datetime, timezone
+
+
+class SystemClock:
+    """Wall time."""
+
+    def __call__(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def isoformat(self):
+        return datetime.fromtimestamp(self(), timezone.utc).isoformat()
+
+
+class VirtualClock(SystemClock):
+    """Simulated time starting at ``start`` (epoch seconds or datetime)."""
+
+    def __init__(self, start=None):
+        if isinstance(start, datetime):
+            start = start.timestamp()
+        self.now = float(time.time() if start is None else start)
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,321 @@
+"""
+Duplicate detection and label merging for collected sensor readings.
+
+A reading is identified by node + timestamp + sensor values. ``DedupIndex``
+keeps a persistent hash set of those keys (8-byte BLAKE2 digests) so each
+ingested row is checked in O(1); an optional Bloom filter trades exactness
+for a fixed memory footprint on very long histories. When a labelled copy of
+a reading arrives after the unlabelled one, the label is merged instead of a
+second row being written (``journal_label`` for rows already in a CSV).
+
+``compact_csv`` rewrites an existing file without duplicates in one streaming
+pass, and ``drop_duplicate_readings`` does the same for a DataFrame at
+training time.
+"""
+import csv
+import hashlib
+import math
+import os
+
+KEY_VALUE_COLUMNS = ["soil_temp", "air_temp", "soil_moisture", "humidity", "light"]
+LABEL_COLUMNS = ["label", "irrigation_needed"]
+
+NEW, DUPLICATE, LABEL_MERGED = "new", "duplicate", "label_merged"
+
+
+def _has_label(value):
+    return value is not None and str(value).strip() not in ("", "nan", "None")
+
+
+def record_key(row):
+    """8-byte digest of node_id + timestamp + sensor values (rounded to 0.01)."""
+    parts = [str(row.get("node_id", "") or ""), str(row.get("timestamp", "")).strip()]
+    for col in KEY_VALUE_COLUMNS:
+        value = row.get(col, row.get("light_intensity") if col == "light" else None)
+        try:
+            parts.append(f"{float(value):.2f}")
+        except (TypeError, ValueError):
+            parts.append("")
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).digest()
+
+
+def label_column_of(row):
+    """Name of the column holding ``row``'s label, or None if it is unlabelled."""
+    for col in LABEL_COLUMNS:
+        if col in row and _has_label(row[col]):
+            return col
+    return None
+
+
+def row_label(row):
+    col = label_column_of(row)
+    return str(row[col]).strip() if col else None
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 8-byte keys (no false negatives)."""
+
+    def __init__(self, capacity=1_000_000, error_rate=1e-4):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key):
+        h1 = int.from_bytes(key[:4], "little")
+        h2 = int.from_bytes(key[4:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class DedupIndex:
+    """
+    Persistent set of seen reading keys with their label state.
+
+    The index file is an append-only log of 9-byte records (digest + label
+    flag), so saving is incremental; reloading keeps the latest state per key.
+    With ``max_keys`` set, keys are kept in two generations: once the current
+    one holds ``max_keys`` keys it becomes the previous one, the older keys
+    are forgotten and the log is rewritten, so memory and file size stay
+    bounded and the index covers roughly the most recent ``max_keys`` to
+    ``2 * max_keys`` readings.
+    With ``bloom_capacity`` set, keys live only in a Bloom filter: memory is
+    bounded, but a small fraction of new rows may be taken for duplicates and
+    late labels cannot be merged.
+    """
+
+    RECORD_SIZE = 9
+
+    def __init__(self, path=None, bloom_capacity=None, error_rate=1e-4, max_keys=None):
+        self.path = path
+        self.bloom = BloomFilter(bloom_capacity, error_rate) if bloom_capacity else None
+        self.max_keys = max_keys
+        self._labels = {}    # digest -> bool (row already carries a label)
+        self._previous = {}  # older generation when max_keys is set
+        self._log = None
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            for i in range(0, len(data) - self.RECORD_SIZE + 1, self.RECORD_SIZE):
+                self._remember(data[i:i + 8], data[i + 8] == 1)
+
+    def __len__(self):
+        return len(self._labels) + len(self._previous)
+
+    def __contains__(self, key):
+        if self.bloom is not None:
+            return key in self.bloom
+        return key in self._labels or key in self._previous
+
+    def _labelled(self, key):
+        return self._labels.get(key, self._previous.get(key, False))
+
+    def _remember(self, key, labelled):
+        if self.bloom is not None:
+            self.bloom.add(key)
+            return
+        self._labels[key] = labelled or self._labelled(key)
+        if self.max_keys and len(self._labels) >= self.max_keys:
+            self._previous, self._labels = self._labels, {}
+            self._rewrite_log()
+
+    def _rewrite_log(self):
+        """Replace the log with the keys still remembered (atomic)."""
+        if not self.path:
+            return
+        self.close()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            for generation in (self._previous, self._labels):
+                f.write(b"".join(k + (b"\x01" if v else b"\x00") for k, v in generation.items()))
+        os.replace(tmp, self.path)
+
+    def _append(self, key, labelled):
+        if not self.path:
+            return
+        if self._log is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._log = open(self.path, "ab")
+        self._log.write(key + (b"\x01" if labelled else b"\x00"))
+
+    def classify(self, row):
+        """Return NEW, DUPLICATE or LABEL_MERGED for ``row`` without recording it."""
+        key = record_key(row)
+        if key not in self:
+            return NEW
+        if self.bloom is None and row_label(row) is not None and not self._labelled(key):
+            return LABEL_MERGED
+        return DUPLICATE
+
+    def record(self, row):
+        """Remember ``row`` (e.g. once it has actually been stored)."""
+        key = record_key(row)
+        labelled = row_label(row) is not None
+        if key in self and (self.bloom is not None or self._labelled(key) or not labelled):
+            return
+        self._remember(key, labelled)
+        self._append(key, labelled)
+
+    def check(self, row):
+        """Classify ``row`` as NEW, DUPLICATE or LABEL_MERGED and record it."""
+        status = self.classify(row)
+        if status != DUPLICATE:
+            self.record(row)
+        return status
+
+    def flush(self):
+        if self._log is not None:
+            self._log.flush()
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+
+def journal_label(path, row):
+    """
+    Record the late label of a reading already written to ``path`` in
+    ``<path>.labels`` (``key,label`` lines); ``compact_csv`` folds it in.
+    """
+    with open(path + ".labels", "a") as f:
+        f.write(f"{record_key(row).hex()},{row_label(row)}\n")
+
+
+def _load_label_journal(path):
+    labels = {}
+    if os.path.exists(path + ".labels"):
+        with open(path + ".labels") as f:
+            for line in f:
+                key, _, label = line.strip().partition(",")
+                if key:
+                    labels[bytes.fromhex(key)] = label
+    return labels
+
+
+def compact_csv(src, dst=None, fieldnames=None, label_column="label", window=100_000):
+    """
+    Rewrite ``src`` without duplicate readings in a single streaming pass.
+
+    Rows are held in an ordered window of at most ``window`` rows so a labelled
+    duplicate arriving within that distance fills in the label of the first
+    copy; labels from ``<src>.labels`` are applied too. Pass ``fieldnames`` for
+    header-less files. Writes to ``dst`` (default: replace ``src`` atomically)
+    and returns (rows read, rows written).
+    """
+    dst_path = dst or src + ".compact.tmp"
+    journal = _load_label_journal(src)
+
+    with open(src, newline="") as fin:
+        reader = csv.DictReader(fin, fieldnames=fieldnames)
+        if reader.fieldnames is None:
+            return 0, 0  # empty file: nothing to compact
+        _check_key_columns(reader.fieldnames, src)
+        with open(dst_path, "w", newline="") as fout:
+            read, written = _compact_rows(reader, fout, journal, label_column, window)
+
+    if dst is None:
+        os.replace(dst_path, src)
+        if os.path.exists(src + ".labels"):
+            os.remove(src + ".labels")
+    return read, written
+
+
+def _check_key_columns(columns, path):
+    """Refuse files whose header has no timestamp/sensor columns: every row would share one key."""
+    columns = {str(c).strip() for c in columns}
+    values = set(KEY_VALUE_COLUMNS) | {"light_intensity"}
+    if "timestamp" not in columns or not columns & values:
+        raise ValueError(
+            f"{path}: header {sorted(columns)} has no timestamp and sensor columns; "
+            "pass fieldnames (--columns) for header-less files"
+        )
+
+
+def _compact_rows(reader, fout, journal, label_column, window):
+    """Stream ``reader`` into ``fout``, dropping duplicates and filling late labels."""
+    seen = set()
+    pending = {}  # key -> row, in arrival order
+    read = written = 0
+    columns = list(reader.fieldnames)
+    if label_column not in columns:
+        columns.append(label_column)
+    writer = csv.DictWriter(fout, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+
+    def emit(key, row):
+        label = row_label(row) or journal.get(key)
+        row[label_column] = label if label is not None else ""
+        writer.writerow(row)
+
+    for row in reader:
+        read += 1
+        key = record_key(row)
+        if key in pending:
+            if not _has_label(pending[key].get(label_column)) and row_label(row) is not None:
+                pending[key][label_column] = row_label(row)
+            continue
+        if key in seen:
+            continue
+        seen.add(key)
+        pending[key] = row
+        if len(pending) > window:
+            old_key = next(iter(pending))
+            emit(old_key, pending.pop(old_key))
+            written += 1
+    for key, row in pending.items():
+        emit(key, row)
+        written += 1
+    return read, written
+
+
+def drop_duplicate_readings(df, label_column=None):
+    """
+    Drop duplicate readings from a DataFrame, keeping the first copy and
+    filling its label from any labelled duplicate.
+    """
+    import pandas as pd
+    if df.empty:
+        return df
+    label_column = label_column or next((c for c in LABEL_COLUMNS if c in df.columns), None)
+    if "timestamp" not in df.columns:
+        # Without a timestamp, equal values are distinct samples, not repeats of one reading
+        return df
+    key_cols = [c for c in ["node_id", "timestamp"] + KEY_VALUE_COLUMNS if c in df.columns]
+    keys = df[key_cols].copy()
+    for col in KEY_VALUE_COLUMNS:
+        if col in keys:
+            keys[col] = pd.to_numeric(keys[col], errors="coerce").round(2)
+    # Merged files may miss columns (NaN); those must join as "" rather than break the key
+    group = keys.astype(object).where(keys.notna(), "").astype(str).agg("|".join, axis=1)
+    # Rows from timestamp-less files are independent samples, never duplicates
+    timestamp = df["timestamp"]
+    keyed = timestamp.notna() & timestamp.astype(str).str.strip().ne("")
+    if label_column:
+        labels = df[label_column].where(df[label_column].astype(str).str.strip().ne(""))
+        merged_label = labels.groupby(group).transform("first").where(keyed, labels)
+        df = df.assign(**{label_column: merged_label})
+    return df.loc[~(group.duplicated() & keyed)].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Rewrite collected CSV files without duplicate readings.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--columns", help="comma-separated header for header-less files")
+    parser.add_argument("--label-column", default="label")
+    args = parser.parse_args()
+    names = args.columns.split(",") if args.columns else None
+    for path in args.files:
+        try:
+            n_in, n_out = compact_csv(path, fieldnames=names, label_column=args.label_column)
+        except ValueError as e:
+            print(f"❌ {e}")
+            continue
+        print(f"🧹 {path}: {n_in} rows -> {n_out} rows ({n_in - n_out} duplicates removed)")
@@ -1,14 +1,19 @@
 import logging
 import os
 
-def get_logger(logfile="data/system.log"):
+def get_logger(logfile="data/system.log", level=None):
+    """
+    Shared 'smart_irrigation' logger. File output defaults to INFO so hot paths
+    don't pay for DEBUG records; set LOG_LEVEL=DEBUG (or pass level) to get them.
+    """
     os.makedirs(os.path.dirname(logfile), exist_ok=True)
     logger = logging.getLogger("smart_irrigation")
     if logger.handlers:
         return logger
-    logger.setLevel(logging.DEBUG)
+    level = level or os.environ.get("LOG_LEVEL", "INFO").upper()
+    logger.setLevel(level)
     fh = logging.FileHandler(logfile)
-    fh.setLevel(logging.DEBUG)
+    fh.setLevel(level)
     ch = logging.StreamHandler()
     ch.setLevel(logging.INFO)
     fmt = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
@@ -0,0 +1,234 @@
+"""
+Incrementally maintained per-node rollups for dashboards and water analytics.
+
+Every reading updates the open minute, hour and day bucket of its node
+(min/max/mean/count of each sensor, time the valve was on, estimated water
+saved). When a bucket closes it is upserted into SQLite, so range queries
+read a few hundred pre-aggregated rows instead of the raw log: a month at
+hourly resolution is 720 rows per node.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.utils import water_saved_litres
+
+LEVELS = {"minute": 60, "hour": 3600, "day": 86400}
+FIELDS = ["soil_temp", "air_temp", "soil_moisture", "humidity", "light"]
+DB_PATH = os.environ.get("IRRIGATION_ROLLUP_DB", "data/rollups.db")
+FLUSH_INTERVAL = 60  # seconds between writes of still-open buckets
+
+_COLUMNS = ["count"] + [f"{f}_{agg}" for f in FIELDS for agg in ("min", "max", "sum")] + [
+    "irrigation_on_s", "water_saved_l"
+]
+
+
+def to_epoch(timestamp):
+    """Accept epoch seconds (number or string), datetime or an ISO string (naive = local time)."""
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    try:
+        return float(timestamp)
+    except ValueError:
+        pass
+    return datetime.fromisoformat(str(timestamp).strip().replace("Z", "+00:00")).timestamp()
+
+
+def is_irrigating(reading):
+    value = reading.get("decision", reading.get("irrigation", reading.get("irrigating")))
+    return value in (1, True, "1", "IRRIGATION", "ON")
+
+
+class _Bucket:
+    __slots__ = ["count", "mins", "maxs", "sums", "irrigation_on_s", "water_saved_l"]
+
+    def __init__(self):
+        self.count = 0
+        self.mins = [float("inf")] * len(FIELDS)
+        self.maxs = [float("-inf")] * len(FIELDS)
+        self.sums = [0.0] * len(FIELDS)
+        self.irrigation_on_s = 0.0
+        self.water_saved_l = 0.0
+
+    def add(self, values, on_s, saved):
+        self.count += 1
+        for i, v in enumerate(values):
+            if v < self.mins[i]:
+                self.mins[i] = v
+            if v > self.maxs[i]:
+                self.maxs[i] = v
+            self.sums[i] += v
+        self.irrigation_on_s += on_s
+        self.water_saved_l += saved
+
+    def row(self):
+        values = [self.count]
+        for i in range(len(FIELDS)):
+            values += [self.mins[i], self.maxs[i], self.sums[i]]
+        return values + [self.irrigation_on_s, self.water_saved_l]
+
+
+class RollupEngine:
+    def __init__(self, db_path=DB_PATH, levels=None, flush_interval=FLUSH_INTERVAL):
+        self.db_path = db_path
+        self.levels = levels or LEVELS
+        self.flush_interval = flush_interval
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._open = {}   # (level, node) -> [bucket_start, _Bucket]
+        self._last = {}   # node -> (epoch, soil_moisture, irrigating)
+        self._last_flush = time.monotonic()
+        self._create_schema()
+
+    def _create_schema(self):
+        cols = ", ".join(f"{c} REAL NOT NULL DEFAULT 0" for c in _COLUMNS)
+        with self._db:
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS rollups (level TEXT NOT NULL, node TEXT NOT NULL, "
+                f"bucket INTEGER NOT NULL, {cols}, PRIMARY KEY (level, node, bucket))"
+            )
+
+    # =============== UPDATE ===============
+    def add(self, reading, node_id=None):
+        """Fold one reading (dict with timestamp + sensor fields) into every level."""
+        ts = to_epoch(reading["timestamp"])
+        node = str(reading.get("node_id", node_id if node_id is not None else "default"))
+        values = [float(reading.get(f, reading.get("light_intensity", 0.0) if f == "light" else 0.0))
+                  for f in FIELDS]
+        moisture = values[FIELDS.index("soil_moisture")]
+        irrigating = is_irrigating(reading)
+
+        with self._lock:
+            prev = self._last.get(node)
+            on_s = saved = 0.0
+            if prev is not None and ts > prev[0]:
+                if prev[2]:
+                    on_s = ts - prev[0]
+                # Unrounded: slow drying adds up even when each step is under 0.01 L
+                saved = water_saved_litres(prev[1], moisture)
+            if prev is None or ts >= prev[0]:
+                self._last[node] = (ts, moisture, irrigating)
+
+            closed = []
+            for level, width in self.levels.items():
+                start = int(ts // width * width)
+                entry = self._open.get((level, node))
+                if entry is None or entry[0] != start:
+                    if entry is not None:
+                        closed.append((level, node, entry[0], entry[1]))
+                    entry = self._open[(level, node)] = [start, _Bucket()]
+                entry[1].add(values, on_s, saved)
+            if closed:
+                self._write(closed)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_open()
+
+    def add_many(self, readings):
+        for reading in readings:
+            self.add(reading)
+
+    def _write(self, buckets):
+        """Upsert buckets, merging with any row already stored for the same bucket."""
+        placeholders = ", ".join("?" for _ in range(3 + len(_COLUMNS)))
+        merge = ", ".join(
+            f"{c} = MIN({c}, excluded.{c})" if c.endswith("_min") else
+            f"{c} = MAX({c}, excluded.{c})" if c.endswith("_max") else
+            f"{c} = {c} + excluded.{c}"
+            for c in _COLUMNS
+        )
+        sql = (f"INSERT INTO rollups (level, node, bucket, {', '.join(_COLUMNS)}) VALUES ({placeholders}) "
+               f"ON CONFLICT(level, node, bucket) DO UPDATE SET {merge}")
+        with self._db:
+            self._db.executemany(sql, [[lvl, node, start] + b.row() for lvl, node, start, b in buckets if b.count])
+
+    def _flush_open(self):
+        buckets = [(lvl, node, e[0], e[1]) for (lvl, node), e in self._open.items()]
+        self._write(buckets)
+        for entry in self._open.values():
+            entry[1] = _Bucket()  # already persisted; keep accumulating from zero
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Persist still-open buckets (e.g. before another process reads the DB)."""
+        with self._lock:
+            self._flush_open()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    # =============== QUERY ===============
+    def pick_level(self, start, end, max_points=2000):
+        """Finest level whose bucket count over [start, end) stays within ``max_points``."""
+        span = max(1.0, to_epoch(end) - to_epoch(start))
+        for level, width in sorted(self.levels.items(), key=lambda kv: kv[1]):
+            if span / width <= max_points:
+                return level
+        return max(self.levels, key=self.levels.get)
+
+    def query(self, start, end, node=None, level=None, max_points=2000):
+        """Return buckets in [start, end) as dicts with min/max/mean per field."""
+        start, end = to_epoch(start), to_epoch(end)
+        level = level or self.pick_level(start, end, max_points)
+        result = []
+        for data in self._rows(start, end, node, level):
+            count = data["count"] or 1
+            item = {
+                "node": data["node"],
+                "level": level,
+                "start": datetime.fromtimestamp(data["bucket"], timezone.utc).isoformat(),
+                "count": int(data["count"]),
+                "irrigation_on_s": round(data["irrigation_on_s"], 1),
+                "water_saved_l": round(data["water_saved_l"], 2),
+            }
+            for f in FIELDS:
+                item[f"{f}_min"] = data[f"{f}_min"]
+                item[f"{f}_max"] = data[f"{f}_max"]
+                item[f"{f}_mean"] = round(data[f"{f}_sum"] / count, 2)
+            result.append(item)
+        return result
+
+    def _rows(self, start, end, node, level):
+        self.flush()
+        sql = f"SELECT node, bucket, {', '.join(_COLUMNS)} FROM rollups WHERE level = ? AND bucket >= ? AND bucket < ?"
+        args = [level, int(start // self.levels[level] * self.levels[level]), end]
+        if node is not None:
+            sql += " AND node = ?"
+            args.append(str(node))
+        sql += " ORDER BY node, bucket"
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        return [dict(zip(["node", "bucket"] + _COLUMNS, row)) for row in rows]
+
+    def totals(self, start, end, node=None):
+        """Readings, irrigation time and water saved over a range, from the coarsest fitting level."""
+        start, end = to_epoch(start), to_epoch(end)
+        # Sum the stored buckets, not query()'s rounded ones, so many small savings still add up
+        rows = self._rows(start, end, node, self.pick_level(start, end, max_points=400))
+        return {
+            "readings": int(sum(r["count"] for r in rows)),
+            "irrigation_on_s": round(sum(r["irrigation_on_s"] for r in rows), 1),
+            "water_saved_l": round(sum(r["water_saved_l"] for r in rows), 2),
+        }
+
+
+if __name__ == "__main__":
+    # Backfill rollups from existing CSV logs: python utils/rollups.py data/realtime_sensor_log.csv ...
+    import csv
+    engine = RollupEngine()
+    for path in sys.argv[1:]:
+        with open(path, newline="") as f:
+            n = 0
+            for row in csv.DictReader(f):
+                engine.add(row)
+                n += 1
+        print(f"📊 {path}: {n} readings rolled up")
+    engine.close()
@@ -0,0 +1,238 @@
+"""
+Shared-memory hand-off of live readings and decisions between processes.
+
+The controller (``main.py``) is the single writer of a fixed-size ring buffer
+in ``multiprocessing.shared_memory``. The Flask and Streamlit apps attach to
+it and read NumPy views straight from the shared pages: no sampling, file or
+network I/O.
+
+Layout: an int64 header ``[magic, capacity, n_fields, seq, written, generation]``
+followed by a float64 ``(capacity, n_fields)`` record array. ``seq`` is a
+seqlock counter: the writer makes it odd before touching a record and even
+afterwards, and readers retry any read during which it changed.
+``generation`` (creation time in ns) tells readers a restarted controller
+has replaced the segment they mapped.
+"""
+import os
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+from multiprocessing import shared_memory
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.rollups import to_epoch
+
+SHM_NAME = os.environ.get("IRRIGATION_SHM_NAME", "smart_irrigation_live")
+DEFAULT_CAPACITY = 4096
+MAX_AGE_S = 60          # newest record older than this means the controller stopped
+REATTACH_S = 5          # how often to retry attaching while there is no fresh data
+MAGIC = 0x49525232  # "IRR2"
+
+FIELDS = ["timestamp", "node_id", "soil_temp", "air_temp", "soil_moisture", "humidity", "light", "decision"]
+_F = {name: i for i, name in enumerate(FIELDS)}
+_HEADER = 6
+_MAGIC, _CAPACITY, _NFIELDS, _SEQ, _WRITTEN, _GENERATION = range(_HEADER)
+
+DECISION_CODES = {"IRRIGATION": 1, "NO_IRRIGATION": 0, "MODEL_NOT_AVAILABLE": -1, 1: 1, 0: 0}
+DECISION_NAMES = {1: "IRRIGATION", 0: "NO_IRRIGATION", -1: "MODEL_NOT_AVAILABLE"}
+
+
+def _views(buf, capacity, n_fields):
+    header = np.ndarray((_HEADER,), dtype=np.int64, buffer=buf)
+    records = np.ndarray((capacity, n_fields), dtype=np.float64, buffer=buf, offset=_HEADER * 8)
+    return header, records
+
+
+def _epoch(timestamp):
+    return to_epoch(timestamp) if timestamp is not None else time.time()
+
+
+def _node_number(node):
+    """Numeric node ids are stored as-is, names as a stable CRC32."""
+    try:
+        return float(int(node))
+    except (TypeError, ValueError):
+        return float(zlib.crc32(str(node).encode("utf-8")))
+
+
+class ShmRingWriter:
+    """Single-writer ring; create it once in the controller process."""
+
+    def __init__(self, name=SHM_NAME, capacity=DEFAULT_CAPACITY):
+        size = _HEADER * 8 + capacity * len(FIELDS) * 8
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a controller that did not exit cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.capacity = capacity
+        self.header, self.records = _views(self.shm.buf, capacity, len(FIELDS))
+        self.records[:] = np.nan
+        self.header[:] = [MAGIC, capacity, len(FIELDS), 0, 0, time.time_ns()]
+
+    def publish(self, reading, decision=None, node_id=None):
+        """Append one reading (dict as produced by ``read_sensor_data``) and its decision."""
+        node = reading.get("node_id", node_id if node_id is not None else 0)
+        decision = reading.get("decision") if decision is None else decision
+        row = (
+            _epoch(reading.get("timestamp")),
+            _node_number(node),
+            reading["soil_temp"], reading["air_temp"], reading["soil_moisture"],
+            reading["humidity"], reading["light"],
+            DECISION_CODES.get(decision, np.nan),
+        )
+        written = int(self.header[_WRITTEN])
+        self.header[_SEQ] += 1          # odd: write in progress
+        self.records[written % self.capacity] = row
+        self.header[_WRITTEN] = written + 1
+        self.header[_SEQ] += 1          # even: consistent again
+
+    def close(self, unlink=True):
+        del self.header, self.records
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class ShmRingReader:
+    """Attach to a ring created by ``ShmRingWriter``; never writes to it."""
+
+    def __init__(self, name=SHM_NAME):
+        if sys.version_info >= (3, 13):
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Stop the resource tracker from unlinking the writer's segment when we exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        header = np.ndarray((_HEADER,), dtype=np.int64, buffer=self.shm.buf)
+        if header[_MAGIC] != MAGIC:
+            self.shm.close()
+            raise ValueError(f"Shared memory segment {name!r} is not an irrigation ring")
+        self.capacity = int(header[_CAPACITY])
+        self.header, self.records = _views(self.shm.buf, self.capacity, int(header[_NFIELDS]))
+        self.records.flags.writeable = False
+        self.header.flags.writeable = False
+
+    @property
+    def written(self):
+        return int(self.header[_WRITTEN])
+
+    @property
+    def generation(self):
+        return int(self.header[_GENERATION])
+
+    def read(self, fn, retries=100):
+        """
+        Run ``fn(records, written)`` on the zero-copy view under the seqlock,
+        retrying if the writer touched the ring meanwhile. ``fn`` should copy
+        or reduce what it needs (e.g. one row or a column mean).
+        """
+        for _ in range(retries):
+            before = int(self.header[_SEQ])
+            if before & 1:
+                time.sleep(0)  # writer mid-update; let it finish
+                continue
+            result = fn(self.records, int(self.header[_WRITTEN]))
+            if int(self.header[_SEQ]) == before:
+                return result
+        raise TimeoutError("Shared ring kept changing while being read")
+
+    def latest(self, n=1):
+        """Last ``n`` records, oldest first, as a (k, n_fields) array copy."""
+        def take(records, written):
+            k = min(n, written, self.capacity)
+            idx = np.arange(written - k, written) % self.capacity
+            return records[idx]
+        return self.read(take)
+
+    def latest_per_node(self):
+        """Most recent record for every node still in the ring, as dicts."""
+        rows = self.latest(self.capacity)
+        seen = {}
+        for row in rows[::-1]:
+            node = row[_F["node_id"]]
+            if node not in seen:
+                seen[node] = to_dict(row)
+        return list(seen.values())
+
+    def close(self):
+        del self.header, self.records
+        self.shm.close()
+
+
+def to_dict(row):
+    record = {name: float(row[i]) for i, name in enumerate(FIELDS)}
+    record["node_id"] = int(record["node_id"])
+    code = record.pop("decision")
+    record["decision"] = DECISION_NAMES.get(int(code), "UNKNOWN") if not np.isnan(code) else "UNKNOWN"
+    return record
+
+
+def attach(name=SHM_NAME):
+    """Return a reader for the controller's ring, or None when it is not running."""
+    try:
+        return ShmRingReader(name)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+class LiveFeed:
+    """
+    Reader for API/dashboard processes that only returns fresh data.
+
+    A mapping stays readable after the controller exits, and a restarted
+    controller creates a new segment under the same name, so every
+    ``REATTACH_S`` the name is re-opened to pick up a new generation, and
+    the newest timestamp is checked against ``max_age``. Safe to share
+    between request threads: a replaced reader is kept mapped until
+    ``close()``, since another thread may still be reading through it.
+    """
+
+    def __init__(self, name=SHM_NAME, max_age=MAX_AGE_S, clock=time.time):
+        self.name = name
+        self.max_age = max_age
+        self.clock = clock
+        self._reader = None
+        self._retired = []  # readers of replaced segments (one per controller restart)
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _fresh(self, reader):
+        if reader.written == 0:
+            return False
+        return self.clock() - reader.latest(1)[0][_F["timestamp"]] <= self.max_age
+
+    def _refresh(self):
+        current = attach(self.name)
+        if current is not None and self._reader is not None and current.generation == self._reader.generation:
+            current.close()
+            return
+        if self._reader is not None:
+            self._retired.append(self._reader)
+        self._reader = current
+
+    def reader(self):
+        """An attached reader of the current segment whose newest record is within ``max_age``, else None."""
+        with self._lock:
+            if self.clock() - self._checked_at >= REATTACH_S:
+                self._refresh()
+                self._checked_at = self.clock()
+            reader = self._reader
+        if reader is None or not self._fresh(reader):
+            return None
+        return reader
+
+    def close(self):
+        """Unmap every reader; only call once no thread is using them."""
+        with self._lock:
+            for reader in self._retired + [self._reader]:
+                if reader is not None:
+                    reader.close()
+            self._reader, self._retired = None, []